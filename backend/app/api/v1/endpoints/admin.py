@@ -5,6 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from app.core.deps import get_current_user
 from app.schemas.validation import UserResponse
 from app.db.mongodb import get_users_collection, get_messages_collection, get_sessions_collection
+from app.services.session_manager import invalidate_sessions_cache
 from bson import ObjectId
 
 logger = logging.getLogger(__name__)
@@ -205,6 +206,7 @@ async def delete_user(
         # Delete all user data
         message_result = await messages_collection.delete_many({"user_id": user_id_param})
         session_result = await sessions_collection.delete_many({"user_id": user_id_param})
+        await invalidate_sessions_cache(user_id_param)
         
         # Delete user
         await users_collection.delete_one({"_id": ObjectId(user_id_param)})
@@ -413,11 +413,13 @@ async def delete_user_account(
 
         # Delete user's messages from MongoDB
         from app.db.mongodb import get_messages_collection, get_sessions_collection
+        from app.services.session_manager import invalidate_sessions_cache
         messages_collection = get_messages_collection()
         sessions_collection = get_sessions_collection()
         
         await messages_collection.delete_many({"user_id": user_id})
         await sessions_collection.delete_many({"user_id": user_id})
+        await invalidate_sessions_cache(user_id)
 
         # Delete user
         await users_collection.delete_one({"_id": ObjectId(user_id)})
@@ -1,18 +1,40 @@
+import asyncio
+import base64
+import bson
+from bson import ObjectId
+from bson.errors import InvalidId
+import gzip
+import hashlib
 import logging
+import traceback
 import uuid
-import json
-from datetime import datetime
-from typing import Optional, List
+import httpx
+import numpy as np
+import orjson
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, List, Tuple
 import re
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
+import sys
+import time
+from dataclasses import dataclass
+from functools import lru_cache, partial
+from itertools import groupby
+from operator import attrgetter
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query, Request, UploadFile, File, Form
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import TypeAdapter
+from pymongo import ReturnDocument
 from app.schemas.validation import ChatRequest, ChatResponse, ConversationType, SessionSummaryResponse, ExportRequest, ExportFormat, FileUploadValidation
 from app.core.deps import get_current_user
 from app.services.ai_provider import generate_response
-from app.services.session_manager import get_session_manager, SessionManager
-from app.services.function_calling import FunctionCallingService, AVAILABLE_TOOLS
+from app.services.ai_provider_streaming import create_streaming_provider
+from app.services.session_manager import get_session_manager, SessionManager, sessions_cache_key, invalidate_sessions_cache
+from app.services.llm_cache import cached_generate
+from app.services.function_calling import function_calling_service, AVAILABLE_TOOLS
 from app.services.model_router import smart_router
 from app.services.memory_service import memory_service
-from app.models.mongo_models import MessageDocument, SessionCreateRequest, SessionUpdateRequest, BulkOperationRequest, MessageReactionRequest, MessageRatingRequest, MessageBranchRequest
+from app.db.redis import get_redis
+from app.models.mongo_models import MessageDocument, SessionDocument, SessionCreateRequest, SessionUpdateRequest, BulkOperationRequest, MessageReactionRequest, MessageRatingRequest, MessageBranchRequest
 from app.utils.exceptions import (
     DatabaseConnectionError, 
     DatabaseTimeoutError, 
@@ -28,12 +50,395 @@ from app.utils.exceptions import (
 from app.middleware.rate_limit import limiter
 from app.core.config import settings
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/chat", tags=["chat"])
+router = APIRouter(prefix="/chat", tags=["chat"], default_response_class=ORJSONResponse)
+
+# Pre-encoded SSE frame fragments for the streaming hot path
+_SSE_CHUNK_PREFIX = b'data: {"type":"chunk","content":'
+_SSE_CHUNK_MID = b',"accumulated":'
+_SSE_CHUNK_SUFFIX = b'}\n\n'
+
+
+def _sse(obj: Any) -> bytes:
+    """Encode an event as an SSE `data:` frame."""
+    return b"data: " + orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS) + b"\n\n"
+
+
+def _sse_chunk(content: str, accumulated: str) -> bytes:
+    """Build a `chunk` SSE frame without allocating an intermediate dict."""
+    return _SSE_CHUNK_PREFIX + orjson.dumps(content) + _SSE_CHUNK_MID + orjson.dumps(accumulated) + _SSE_CHUNK_SUFFIX
+
+
+# Tool calls finishing within this window (seconds) are reported in one SSE frame
+_TOOL_COALESCE_WINDOW = 0.05
+
+
+_SESSION_TITLE_TIME_FMT = " %Y-%m-%d %H:%M"
+
+
+def _session_title(prefix: str) -> str:
+    """Default title for a session created on the fly; only called on the create path."""
+    return prefix + time.strftime(_SESSION_TITLE_TIME_FMT, time.gmtime())
+
+
+# List serializers built once at import; pydantic-core dumps a whole page in one pass
+_MESSAGES_ADAPTER = TypeAdapter(List[MessageDocument])
+_SESSIONS_ADAPTER = TypeAdapter(List[SessionDocument])
+_HISTORY_INCLUDE = {"__all__": {"id", "role", "content", "created_at", "attachments", "metadata"}}
+_SESSION_LIST_INCLUDE = {"__all__": {
+    "session_id", "title", "category", "tags", "status", "is_pinned", "is_favorite",
+    "message_count", "last_activity", "created_at"
+}}
+
+# Seconds a rendered GET /sessions page stays in Redis; writes invalidate it sooner
+_SESSIONS_CACHE_TTL = 10
+
+
+def _log_failed_user_message(task: asyncio.Task) -> None:
+    """Log a failed background user-message insert, whichever path the stream took."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Failed to store user message: {task.exception()}")
+
+
+def _to_oid(message_id: str) -> ObjectId:
+    """Parse a message id, rejecting malformed ids with 400 before touching the database."""
+    try:
+        return ObjectId(message_id)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid message ID")
+
+
+def _validate_session_id(session_id: str) -> None:
+    """Reject anything that is not a hyphenated UUID string with a 400."""
+    try:
+        if len(session_id) != 36:
+            raise ValueError(session_id)
+        uuid.UUID(session_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid session ID format")
+
+
+# Uploads larger than this (bytes) are base64-encoded off the event loop
+_OFFLOAD_THRESHOLD = 256 * 1024
+
+_QUERY_STRIP_RE = re.compile(r'[<>]')
+
+# orjson serializes datetimes natively; stored timestamps are naive UTC
+_EXPORT_JSON_OPTS = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+
+# Message fields included per exported message, with and without metadata
+_EXPORT_FIELDS_FULL = frozenset({"id", "role", "content", "created_at", "attachments", "metadata"})
+_EXPORT_FIELDS_BASIC = frozenset({"role", "content"})
+
+_TXT_EXPORT_HEADER = (
+    "Conversation Export - Session: {sid}\n"
+    "Exported at: {ts}\n"
+    "Total messages: {n}\n"
+    + "-" * 50 + "\n"
+)
+_MD_EXPORT_HEADER = (
+    "# Conversation Export\n\n"
+    "**Session ID:** {sid}\n"
+    "**Exported at:** {ts}\n"
+    "**Total messages:** {n}\n\n"
+    "---\n\n"
+)
+_ROLE_EMOJI = {"user": "\U0001F464", "assistant": "\U0001F916"}
+
+# Model name fragments that identify function-calling capable models
+# Supported: All OpenRouter models, Gemini, Groq Llama, Qwen, DeepSeek, Grok, Nemotron, Kimi
+_SUPPORTED_FC_PREFIXES = (
+    "gpt-oss", "gpt-4", "gpt-3.5", "claude", "gemini", "mistral",
+    "command-r", "deepseek", "qwen", "llama-3.1", "llama-3.2", "grok",
+    "nemotron", "kimi", "moonshot", "openai", "x-ai", "xai"
+)
+
+
+@lru_cache(maxsize=256)
+def _supports_function_calling(model: str) -> bool:
+    """Return whether a model name matches a function-calling capable family."""
+    m = model.lower()
+    return any(p in m for p in _SUPPORTED_FC_PREFIXES)
+
+
+@dataclass(frozen=True, slots=True)
+class ModelInfo:
+    """Catalog entry for a model exposed by GET /models."""
+    id: str
+    name: str
+    provider: str
+    type: str
+    supports_streaming: bool
+    supports_function_calling: bool
+    context_window: int
+    cost_per_1k_tokens: float
+
+    def __post_init__(self):
+        # Intern the strings repeated across records so they share one object
+        object.__setattr__(self, "provider", sys.intern(self.provider))
+        object.__setattr__(self, "type", sys.intern(self.type))
+
+
+# Static model catalog served by GET /models, built once at import
+_AVAILABLE_MODELS: Tuple[ModelInfo, ...] = (
+    # General Purpose Models
+    ModelInfo(
+        id="openai/gpt-oss-20b:free",
+        name="GPT-OSS 20B (Free)",
+        provider="OpenRouter",
+        type="general",
+        supports_streaming=True,
+        supports_function_calling=True,
+        context_window=8192,
+        cost_per_1k_tokens=0.0
+    ),
+    ModelInfo(
+        id="llama-3.1-8b-instant",
+        name="Llama 3.1 8B Instant",
+        provider="Groq",
+        type="general",
+        supports_streaming=True,
+        supports_function_calling=True,
+        context_window=8192,
+        cost_per_1k_tokens=0.0
+    ),
+    # Coding Models
+    ModelInfo(
+        id="qwen/qwen3-coder:free",
+        name="Qwen3 Coder",
+        provider="OpenRouter",
+        type="coding",
+        supports_streaming=True,
+        supports_function_calling=True,
+        context_window=32768,
+        cost_per_1k_tokens=0.0
+    ),
+    ModelInfo(
+        id="x-ai/grok-2:free",
+        name="Grok 2",
+        provider="OpenRouter",
+        type="coding",
+        supports_streaming=True,
+        supports_function_calling=True,
+        context_window=32768,
+        cost_per_1k_tokens=0.0
+    ),
+    # Reasoning Models
+    ModelInfo(
+        id="moonshotai/kimi-k2:free",
+        name="Kimi K2",
+        provider="OpenRouter",
+        type="reasoning",
+        supports_streaming=True,
+        supports_function_calling=True,
+        context_window=128000,
+        cost_per_1k_tokens=0.0
+    ),
+    ModelInfo(
+        id="deepseek/deepseek-r1:free",
+        name="DeepSeek R1",
+        provider="OpenRouter",
+        type="reasoning",
+        supports_streaming=True,
+        supports_function_calling=True,
+        context_window=64000,
+        cost_per_1k_tokens=0.0
+    ),
+    # Vision/Image Models
+    ModelInfo(
+        id="google/gemma-3-27b-it:free",
+        name="Gemma 3 27B",
+        provider="OpenRouter",
+        type="image",
+        supports_streaming=True,
+        supports_function_calling=True,
+        context_window=8192,
+        cost_per_1k_tokens=0.0
+    ),
+    ModelInfo(
+        id="qwen/qwen2.5-vl-32b-instruct:free",
+        name="Qwen2.5 VL 32B",
+        provider="OpenRouter",
+        type="image",
+        supports_streaming=True,
+        supports_function_calling=True,
+        context_window=32768,
+        cost_per_1k_tokens=0.0
+    ),
+    ModelInfo(
+        id="nvidia/nemotron-nano-12b-v2-vl:free",
+        name="Nemotron Nano 12B V2 VL",
+        provider="OpenRouter",
+        type="image",
+        supports_streaming=True,
+        supports_function_calling=True,
+        context_window=8192,
+        cost_per_1k_tokens=0.0
+    ),
+    # Text Processing Models
+    ModelInfo(
+        id="gemini-2.5-flash",
+        name="Gemini 2.5 Flash",
+        provider="Google",
+        type="text",
+        supports_streaming=True,
+        supports_function_calling=True,
+        context_window=1000000,
+        cost_per_1k_tokens=0.0
+    ),
+)
+
 
-# Initialize function calling service
-function_calling_service = FunctionCallingService()
+_N_MODELS = len(_AVAILABLE_MODELS)
+
+# O(1) catalog lookup by model id
+_MODELS_BY_ID: Dict[str, ModelInfo] = {m.id: m for m in _AVAILABLE_MODELS}
+
+
+def get_model(model_id: str) -> Optional[ModelInfo]:
+    """Return the catalog entry for a model id, or None if it is not listed."""
+    return _MODELS_BY_ID.get(model_id)
+
+
+# Pre-serialized /models body; only the model list varies between variants
+_MODELS_JSON = orjson.dumps(_AVAILABLE_MODELS)
+_MODELS_BODY_HEAD = b'{"success":true,"models":'
+_MODELS_BODY_MID = b',"catalog_generated_at":"'
+_MODELS_BODY_PREFIX = _MODELS_BODY_HEAD + _MODELS_JSON + _MODELS_BODY_MID
+_MODELS_BODY_SUFFIX = b'"}'
+
+# Large catalogs are streamed model by model instead of sent as one blob
+_MODELS_STREAM_THRESHOLD = 200
+_MODEL_JSON_CHUNKS = tuple(orjson.dumps(m) for m in _AVAILABLE_MODELS)
+_STREAM_MODELS = _N_MODELS > _MODELS_STREAM_THRESHOLD
+
+
+async def _iter_models_body():
+    """Yield the /models body incrementally from the per-model encodings."""
+    yield _MODELS_BODY_HEAD + b"["
+    for i, chunk in enumerate(_MODEL_JSON_CHUNKS):
+        yield b"," + chunk if i else chunk
+    yield b"]" + _MODELS_BODY_MID + _MODELS_GENERATED_AT + _MODELS_BODY_SUFFIX
+
+
+# Content-addressed copy of the catalog that a CDN can cache indefinitely
+_CATALOG_HASH = hashlib.blake2b(_MODELS_JSON, digest_size=6).hexdigest()
+_CATALOG_FILENAME = f"models-v{_CATALOG_HASH}.json"
+_CATALOG_BODY = _MODELS_BODY_HEAD + _MODELS_JSON + b"}"
+
+
+# Content codings we can produce, in server preference order for equal q-values
+_SERVED_ENCODINGS: Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best content coding we can serve from an Accept-Encoding header."""
+    weights: Dict[str, float] = {}
+    for token in accept_encoding.split(","):
+        coding, _, params = token.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        name, _, value = params.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                weight = float(value)
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for coding in _SERVED_ENCODINGS:
+        weight = weights.get(coding, wildcard)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def _compress(body: bytes, encoding: Optional[str]) -> bytes:
+    """Compress a catalog body at maximum level for the negotiated coding."""
+    if encoding == "br":
+        return brotli.compress(body, quality=11)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=9)
+    return body
+
+
+# Versioned catalog compressed once at import for every coding we support
+_CATALOG_BODIES: Dict[Optional[str], bytes] = {
+    encoding: _compress(_CATALOG_BODY, encoding)
+    for encoding in (None, "gzip", "br") if encoding != "br" or brotli is not None
+}
+
+# The catalog only changes on deploy, so every /models body carries the time it
+# was built at import and the unfiltered body's ETag covers every byte
+_MODELS_GENERATED_AT = datetime.utcfromtimestamp(int(time.time())).isoformat().encode()
+_MODELS_BODY = _MODELS_BODY_PREFIX + _MODELS_GENERATED_AT + _MODELS_BODY_SUFFIX
+_MODELS_ETAG = '"' + hashlib.blake2b(_MODELS_BODY, digest_size=8).hexdigest() + '"'
+_MODELS_CACHE_HEADERS = {
+    "ETag": _MODELS_ETAG,
+    "Cache-Control": "private, max-age=300",
+    "Link": f'<{_CATALOG_FILENAME}>; rel="alternate"; type="application/json"',
+    "Vary": "Accept-Encoding"
+}
+_ETAG_SUFFIX = {"gzip": "-gz", "br": "-br"}
+
+# Unfiltered body compressed once at import; each coding gets its own strong ETag
+_MODELS_BODIES: Dict[Optional[str], bytes] = {
+    encoding: _compress(_MODELS_BODY, encoding) for encoding in _CATALOG_BODIES
+}
+_MODELS_HEADERS_BY_ENCODING: Dict[Optional[str], Dict[str, str]] = {
+    encoding: {
+        **_MODELS_CACHE_HEADERS,
+        "ETag": _MODELS_ETAG[:-1] + _ETAG_SUFFIX[encoding] + '"',
+        "Content-Encoding": encoding
+    } if encoding else _MODELS_CACHE_HEADERS
+    for encoding in _MODELS_BODIES
+}
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header lists the given entity tag (or '*')."""
+    if not if_none_match:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    return etag in tags or "*" in tags
+
+
+# Per-type sub-catalogs, pre-serialized for ?type= queries
+_MODELS_BY_TYPE: Dict[str, Tuple[ModelInfo, ...]] = {
+    model_type: tuple(group)
+    for model_type, group in groupby(sorted(_AVAILABLE_MODELS, key=attrgetter("type")), key=attrgetter("type"))
+}
+_MODELS_JSON_BY_TYPE: Dict[str, bytes] = {k: orjson.dumps(v) for k, v in _MODELS_BY_TYPE.items()}
+
+# Columnar views of the catalog for vectorized filtering
+_model_types = np.array([m.type for m in _AVAILABLE_MODELS])
+_model_providers = np.array([m.provider for m in _AVAILABLE_MODELS])
+_model_streaming = np.array([m.supports_streaming for m in _AVAILABLE_MODELS], dtype=bool)
+
+
+def _filter_models(
+    model_type: Optional[str] = None,
+    provider: Optional[str] = None,
+    supports_streaming: Optional[bool] = None
+) -> List[ModelInfo]:
+    """Select catalog entries matching all given criteria via boolean masks."""
+    mask = np.ones(_N_MODELS, dtype=bool)
+    if model_type is not None:
+        mask &= _model_types == model_type
+    if provider is not None:
+        mask &= _model_providers == provider
+    if supports_streaming is not None:
+        mask &= _model_streaming == supports_streaming
+    return [_AVAILABLE_MODELS[i] for i in np.flatnonzero(mask)]
 
 
 @router.post("/", response_model=ChatResponse)
@@ -43,10 +448,10 @@ async def chat(
     session_manager: SessionManager = Depends(get_session_manager)
 ):
     try:
-        logger.info(f"Chat request from user {user_id}: {req.message[:50]}...")
+        logger.info("Chat request from user %s: %s...", user_id, req.message[:50])
 
         if not req.message:
-            logger.warning(f"Empty message from user {user_id}")
+            logger.warning("Empty message from user %s", user_id)
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Message is required")
 
         # Get session_id from request body (not query parameter)
@@ -55,39 +460,29 @@ async def chat(
 
         # Check if session exists, create if not provided or doesn't exist
         if session_id:
-            logger.info(f"Looking for existing session: {session_id}")
-            session = await session_manager.get_session(user_id, session_id)
+            logger.info("Looking for existing session: %s", session_id)
+            # Fetch the session and its context (last 10 messages) in one round-trip
+            session, recent_messages = await session_manager.get_session_with_recent(user_id, session_id, limit=10)
             if session:
-                logger.info(f"Using existing session: {session_id}")
+                logger.info("Using existing session: %s", session_id)
             else:
-                logger.warning(f"Session {session_id} not found, creating new one")
-                session_req = SessionCreateRequest(title=f"Chat {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}")
+                logger.warning("Session %s not found, creating new one", session_id)
+                session_req = SessionCreateRequest(title=_session_title("Chat"))
                 session = await session_manager.create_session(user_id, session_req)
                 session_id = session.session_id
-                logger.info(f"Created new session: {session_id}")
+                recent_messages = []
+                logger.info("Created new session: %s", session_id)
         else:
             logger.info("No session_id provided, creating new session")
-            session_req = SessionCreateRequest(title=f"Chat {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}")
+            session_req = SessionCreateRequest(title=_session_title("Chat"))
             session = await session_manager.create_session(user_id, session_req)
             session_id = session.session_id
-            logger.info(f"Created new session: {session_id}")
-
-        # Get conversation context (last 10 messages from this session)
-        recent_messages = await session_manager.get_recent_messages(user_id, session_id, limit=10)
+            recent_messages = []
+            logger.info("Created new session: %s", session_id)
 
-        # Build conversation context
-        conversation_context = []
-        for msg in recent_messages:
-            conversation_context.append({
-                "role": msg.role,
-                "content": msg.content
-            })
-
-        # Add current message
-        conversation_context.append({
-            "role": "user",
-            "content": req.message
-        })
+        # Build conversation context, ending with the current message
+        conversation_context = [{"role": msg.role, "content": msg.content} for msg in recent_messages]
+        conversation_context.append({"role": "user", "content": req.message})
 
         # 🧠 MEMORY INTEGRATION: Retrieve relevant memories with context awareness
         relevant_memories = []
@@ -98,7 +493,7 @@ async def chat(
                 message=req.message,
                 recent_messages=recent_messages[-5:] if len(recent_messages) >= 5 else recent_messages
             )
-            logger.info(f"Detected conversation contexts: {conversation_contexts}")
+            logger.info("Detected conversation contexts: %s", conversation_contexts)
             
             # Retrieve memories with context filtering
             relevant_memories = await memory_service.get_relevant_memories(
@@ -110,35 +505,28 @@ async def chat(
             )
             
             if relevant_memories:
-                logger.info(f"Retrieved {len(relevant_memories)} relevant memories for user {user_id}")
+                logger.info("Retrieved %s relevant memories for user %s", len(relevant_memories), user_id)
                 memory_lines = []
                 for mem in relevant_memories:
                     memory_lines.append(f"- {mem.content} [{mem.memory_type}]")
                 memory_context = "\n".join(memory_lines)
-                logger.info(f"Memory context: {memory_context[:200]}...")
+                logger.info("Memory context: %s...", memory_context[:200])
             else:
-                logger.info(f"No relevant memories found for user {user_id}")
+                logger.info("No relevant memories found for user %s", user_id)
         except Exception as e:
-            logger.warning(f"Failed to retrieve memories for user {user_id}: {e}")
+            logger.warning("Failed to retrieve memories for user %s: %s", user_id, e)
             # Continue without memories if retrieval fails
 
-        # Create enhanced prompt with context AND memories
-        prompt_parts = []
+        # Build structured message history with context AND memories; tool turns
+        # are appended to it instead of re-concatenating a prompt every iteration
+        messages = []
         
         # Add memory context first (what we know about the user)
         if memory_context:
-            prompt_parts.append(f"What I know about you:\n{memory_context}\n")
-        
-        # Add conversation context
-        if conversation_context:
-            context_prompt = "\n".join([f"{msg['role']}: {msg['content']}" for msg in conversation_context])
-            prompt_parts.append(f"Conversation history:\n{context_prompt}")
+            messages.append({"role": "system", "content": f"What I know about you:\n{memory_context}"})
         
-        # Combine all parts
-        if prompt_parts:
-            enhanced_prompt = "\n\n".join(prompt_parts)
-        else:
-            enhanced_prompt = req.message
+        # Add conversation context (ends with the current user message)
+        messages.extend(conversation_context)
 
         # Calculate context length for smart routing
         context_token_estimate = sum(len(msg['content'].split()) * 1.3 for msg in conversation_context)
@@ -160,72 +548,81 @@ async def chat(
             selected_model = routing_decision["model"]
             routing_metadata = routing_decision
             logger.info(
-                f"Smart Router selected: {selected_model} | "
-                f"Complexity: {routing_decision['complexity']} | "
-                f"Reason: {routing_decision['reason']}"
+                "Smart Router selected: %s | Complexity: %s | Reason: %s",
+                selected_model, routing_decision['complexity'], routing_decision['reason']
             )
         else:
-            logger.info(f"User specified model: {selected_model}")
+            logger.info("User specified model: %s", selected_model)
 
         # Check if model supports function calling
-        # Supported: All OpenRouter models, Gemini, Groq Llama, Qwen, DeepSeek, Grok, Nemotron, Kimi
-        model_supports_functions = selected_model and any(
-            model_prefix in selected_model.lower() 
-            for model_prefix in [
-                "gpt-oss", "gpt-4", "gpt-3.5", "claude", "gemini", "mistral", 
-                "command-r", "deepseek", "qwen", "llama-3.1", "llama-3.2", "grok",
-                "nemotron", "kimi", "moonshot", "openai", "x-ai", "xai"
-            ]
-        )
+        model_supports_functions = bool(selected_model) and _supports_function_calling(selected_model)
 
         # Enable tools for supported models
         tools = AVAILABLE_TOOLS if model_supports_functions else None
         
         if model_supports_functions:
-            logger.info(f"Model {selected_model} supports function calling. Tools enabled: {len(AVAILABLE_TOOLS)} tools")
+            logger.info("Model %s supports function calling. Tools enabled: %s tools", selected_model, len(AVAILABLE_TOOLS))
         else:
-            logger.info(f"Model {selected_model} does not support function calling")
+            logger.info("Model %s does not support function calling", selected_model)
         
         # Generate AI response with function calling support
         max_iterations = 2  # Reduced from 5 to prevent rate limiting - max 2 tool calls
         iteration = 0
         final_response = None
         tool_results = []
+        seen_calls = set()  # (name, sorted-args JSON) of every tool call already executed
         
         while iteration < max_iterations:
             iteration += 1
-            logger.info(f"Function calling iteration {iteration}/{max_iterations}")
+            logger.info("Function calling iteration %s/%s", iteration, max_iterations)
             
-            resp = await generate_response(
-                enhanced_prompt,
+            temperature = req.temperature if req.temperature is not None else 0.7
+            generate = partial(
+                generate_response,
+                req.message,
                 request_type=conversation_type.value,
                 model=selected_model,
                 max_tokens=req.max_tokens or 1000,
-                temperature=req.temperature or 0.7,
-                tools=tools
+                temperature=temperature,
+                tools=tools,
+                messages=messages
             )
             
+            # Near-deterministic, tool-free completions are served from the LLM cache
+            if temperature <= 0.1 and not tools:
+                resp = await cached_generate(
+                    (selected_model, temperature, req.max_tokens or 1000, conversation_type.value, messages),
+                    generate
+                )
+            else:
+                resp = await generate()
+            
             # Check if AI wants to call a function
             tool_calls = resp.get("tool_calls")
             
-            if tool_calls:
-                logger.info(f"AI requested {len(tool_calls)} tool calls: {[tc.get('function', {}).get('name') for tc in tool_calls]}")
-            
             if not tool_calls:
                 # No function calls, we have the final response
                 final_response = resp
                 break
             
+            # Extract each call's function spec and name once for logging and execution
+            tc_functions = [tc.get("function", {}) for tc in tool_calls]
+            tc_names = [function.get("name") for function in tc_functions]
+            
             # Execute all requested function calls
-            logger.info(f"AI requested {len(tool_calls)} tool calls")
+            logger.info("AI requested %s tool calls: %s", len(tool_calls), tc_names)
             function_results = []
             
-            for tool_call in tool_calls:
-                function_name = tool_call.get("function", {}).get("name")
-                function_args_raw = tool_call.get("function", {}).get("arguments", "{}")
+            tool_calls_meta = []
+            tool_coros = []
+            assistant_tool_calls = []
+            
+            for tool_call, function, function_name in zip(tool_calls, tc_functions, tc_names):
+                function_args_raw = function.get("arguments", "{}")
                 tool_call_id = tool_call.get("id", str(uuid.uuid4()))
                 
-                logger.info(f"Executing tool: {function_name} with args: {function_args_raw}")
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("Executing tool: %s with args: %s", function_name, function_args_raw)
                 
                 # Parse arguments - handle both dict and JSON string formats
                 try:
@@ -234,19 +631,48 @@ async def chat(
                         function_args = function_args_raw
                     elif isinstance(function_args_raw, str):
                         # JSON string (e.g., from OpenAI)
-                        function_args = json.loads(function_args_raw)
+                        function_args = orjson.loads(function_args_raw)
                     else:
-                        logger.error(f"Unexpected argument type: {type(function_args_raw)}")
+                        logger.error("Unexpected argument type: %s", type(function_args_raw))
                         function_args = {}
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse function arguments: {function_args_raw}, error: {e}")
+                except orjson.JSONDecodeError as e:
+                    logger.error("Failed to parse function arguments: %s, error: %s", function_args_raw, e)
                     function_args = {}
                 
-                # Execute the function
-                result = await function_calling_service.execute_function(
-                    function_name, 
-                    function_args
-                )
+                # Skip calls the model already made - repeating them cannot make progress
+                signature = (function_name, orjson.dumps(function_args, option=orjson.OPT_SORT_KEYS))
+                is_duplicate = signature in seen_calls
+                seen_calls.add(signature)
+                
+                tool_calls_meta.append((function_name, function_args, tool_call_id, is_duplicate))
+                assistant_tool_calls.append({
+                    "id": tool_call_id,
+                    "type": "function",
+                    "function": {"name": function_name, "arguments": orjson.dumps(function_args).decode()}
+                })
+                if not is_duplicate:
+                    tool_coros.append(asyncio.wait_for(
+                        function_calling_service.execute_function(function_name, function_args),
+                        timeout=settings.TOOL_TIMEOUT
+                    ))
+            
+            if not tool_coros:
+                # Every call in this turn was a repeat - the model is looping
+                logger.warning("Only duplicate tool calls requested, stopping function calling for user %s", user_id)
+                final_response = resp
+                break
+            
+            # Execute the functions concurrently - tools within one turn are independent
+            results = iter(await asyncio.gather(*tool_coros, return_exceptions=True))
+            
+            for function_name, function_args, tool_call_id, is_duplicate in tool_calls_meta:
+                result = {"error": "duplicate call", "success": False} if is_duplicate else next(results)
+                if isinstance(result, asyncio.TimeoutError):
+                    logger.error("Tool %s timed out after %ss", function_name, settings.TOOL_TIMEOUT)
+                    result = {"error": f"Tool timed out after {settings.TOOL_TIMEOUT}s", "success": False}
+                elif isinstance(result, Exception):
+                    logger.error("Tool %s failed: %s", function_name, result)
+                    result = {"error": str(result), "success": False}
                 
                 tool_results.append({
                     "name": function_name,
@@ -262,13 +688,14 @@ async def chat(
                     "content": str(result.get("result") if result.get("success") else result.get("error"))
                 })
             
-            # Update prompt with function results for next iteration
+            # Append the tool-call turn and its results to the history for the next iteration
             if function_results:
-                results_text = "\n\n".join([
-                    f"Tool: {fr['name']}\nResult: {fr['content']}"
-                    for fr in function_results
-                ])
-                enhanced_prompt = f"{enhanced_prompt}\n\nTool Results:\n{results_text}\n\nPlease provide a final response using these results."
+                messages.append({
+                    "role": "assistant",
+                    "content": resp.get("reply") or "",
+                    "tool_calls": assistant_tool_calls
+                })
+                messages.extend(function_results)
             else:
                 # No results, break to avoid loop
                 final_response = resp
@@ -277,15 +704,11 @@ async def chat(
         if not final_response:
             # Max iterations reached, use last response
             final_response = resp
-            logger.warning(f"Max function calling iterations reached for user {user_id}")
+            logger.warning("Max function calling iterations reached for user %s", user_id)
         
         # Store metadata about tool usage
-        if tool_results:
-            logger.info(f"Tools used in conversation: {[t['name'] for t in tool_results]}")
-
-        # Store metadata about tool usage
-        if tool_results:
-            logger.info(f"Tools used in conversation: {[t['name'] for t in tool_results]}")
+        if tool_results and logger.isEnabledFor(logging.INFO):
+            logger.info("Tools used in conversation: %s", [t['name'] for t in tool_results])
 
         # Store user message in MongoDB
         user_message = MessageDocument(
@@ -297,7 +720,6 @@ async def chat(
             model_used=final_response.get("model"),
             provider_used=final_response.get("provider")
         )
-        user_message_id = await session_manager.add_message(user_message)
 
         # Store AI response in MongoDB with tool usage metadata
         ai_message_content = final_response["reply"]
@@ -330,15 +752,12 @@ async def chat(
                 ] if relevant_memories else []
             }
         )
-        ai_message_id = await session_manager.add_message(ai_message)
+        user_message_id, ai_message_id = await session_manager.add_messages([user_message, ai_message])
 
-        logger.info(f"Chat response generated and stored for user {user_id}")
+        logger.info("Chat response generated and stored for user %s", user_id)
 
         # 🧠 AUTOMATIC MEMORY EXTRACTION: Extract with throttling to prevent duplicates
         try:
-            import asyncio
-            from datetime import timedelta
-            
             # Get session to check extraction status
             session = await session_manager.get_session(user_id, session_id)
             
@@ -354,7 +773,7 @@ async def chat(
             if session.last_memory_extraction is None:
                 should_extract = messages_since_extraction >= 2  # First extraction after just 2 messages (lowered for testing)
                 reason = "initial extraction"
-                logger.info(f"🧠 Memory extraction check: session_id={session_id}, messages={messages_since_extraction}, threshold=2, should_extract={should_extract}")
+                logger.info("🧠 Memory extraction check: session_id=%s, messages=%s, threshold=2, should_extract=%s", session_id, messages_since_extraction, should_extract)
             elif messages_since_extraction >= 15:
                 should_extract = True
                 reason = f"{messages_since_extraction} new messages"
@@ -371,9 +790,7 @@ async def chat(
                     )
                 )
                 # Update extraction tracking
-                from app.db.mongodb import mongodb_manager
-                sessions_collection = mongodb_manager.get_collection("sessions")
-                from bson import ObjectId
+                sessions_collection = session_manager.sessions_collection
                 await sessions_collection.update_one(
                     {"session_id": session_id, "user_id": user_id},
                     {
@@ -383,11 +800,14 @@ async def chat(
                         }
                     }
                 )
-                logger.info(f"🧠 Triggered memory extraction for session {session_id} ({reason})")
+                logger.info("🧠 Triggered memory extraction for session %s (%s)", session_id, reason)
             else:
-                logger.debug(f"🧠 Skipped memory extraction (throttled): {messages_since_extraction} messages since last")
+                logger.debug("🧠 Skipped memory extraction (throttled): %s messages since last", messages_since_extraction)
         except Exception as e:
-            logger.warning(f"Memory extraction trigger failed (non-critical): {e}")
+            logger.warning("Memory extraction trigger failed (non-critical): %s", e)
+
+        # After the extraction bookkeeping so the next list read sees every write of this turn
+        await invalidate_sessions_cache(user_id)
 
         # Format used_memories for response
         used_memories_response = [
@@ -415,22 +835,22 @@ async def chat(
     except HTTPException:
         raise
     except DatabaseConnectionError as e:
-        logger.error(f"Database connection error for user {user_id}: {e}")
+        logger.error("Database connection error for user %s: %s", user_id, e)
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database temporarily unavailable. Please try again later.")
     except DatabaseTimeoutError as e:
-        logger.error(f"Database timeout error for user {user_id}: {e}")
+        logger.error("Database timeout error for user %s: %s", user_id, e)
         raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Request timed out. Please try again.")
     except (DatabaseValidationError, MessageValidationError) as e:
-        logger.error(f"Validation error for user {user_id}: {e}")
+        logger.error("Validation error for user %s: %s", user_id, e)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except SessionNotFoundError as e:
-        logger.error(f"Session not found error for user {user_id}: {e}")
+        logger.error("Session not found error for user %s: %s", user_id, e)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Session {e.session_id} not found")
     except ExternalServiceError as e:
-        logger.error(f"External service error for user {user_id}: {e}")
+        logger.error("External service error for user %s: %s", user_id, e)
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="AI service temporarily unavailable. Please try again later.")
     except Exception as e:
-        logger.error(f"Unexpected chat error for user {user_id}: {e}")
+        logger.error("Unexpected chat error for user %s: %s", user_id, e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred. Please try again.")
 
 
@@ -445,30 +865,33 @@ async def chat_with_files(
     session_manager: SessionManager = Depends(get_session_manager)
 ):
     try:
-        logger.info(f"Chat request with files from user {user_id}: {message[:50]}...")
+        logger.info("Chat request with files from user %s: %s...", user_id, message[:50])
 
         if not message and (not files or len(files) == 0):
-            logger.warning(f"Empty message and no files from user {user_id}")
+            logger.warning("Empty message and no files from user %s", user_id)
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Message or files are required")
 
         # Check if session exists, create if not provided or doesn't exist
         if session_id:
-            logger.info(f"Looking for existing session: {session_id}")
-            session = await session_manager.get_session(user_id, session_id)
+            logger.info("Looking for existing session: %s", session_id)
+            # Fetch the session and its context (last 10 messages) in one round-trip
+            session, recent_messages = await session_manager.get_session_with_recent(user_id, session_id, limit=10)
             if session:
-                logger.info(f"Using existing session: {session_id}")
+                logger.info("Using existing session: %s", session_id)
             else:
-                logger.warning(f"Session {session_id} not found, creating new one")
-                session_req = SessionCreateRequest(title=f"Chat with files {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}")
+                logger.warning("Session %s not found, creating new one", session_id)
+                session_req = SessionCreateRequest(title=_session_title("Chat with files"))
                 session = await session_manager.create_session(user_id, session_req)
                 session_id = session.session_id
-                logger.info(f"Created new session: {session_id}")
+                recent_messages = []
+                logger.info("Created new session: %s", session_id)
         else:
             logger.info("No session_id provided, creating new session")
-            session_req = SessionCreateRequest(title=f"Chat with files {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}")
+            session_req = SessionCreateRequest(title=_session_title("Chat with files"))
             session = await session_manager.create_session(user_id, session_req)
             session_id = session.session_id
-            logger.info(f"Created new session: {session_id}")
+            recent_messages = []
+            logger.info("Created new session: %s", session_id)
 
         # Process file attachments with better error handling
         file_info = []
@@ -481,8 +904,10 @@ async def chat_with_files(
                     continue
 
                 try:
-                    # Read file info for validation
-                    file_size = len(await file.read())
+                    # Read the upload once; cap the read so oversized files fail
+                    # validation without being buffered in full
+                    buf = await file.read(FileUploadValidation.MAX_FILE_SIZE + 1)
+                    file_size = len(buf)
                     file_type = file.content_type or "unknown"
 
                     # Validate file
@@ -498,29 +923,28 @@ async def chat_with_files(
                         "type": file_type
                     })
 
-                    # Reset file pointer for processing
-                    await file.seek(0)
-
                     # Handle different file types
                     if file_type.startswith('image/'):
                         # For image files, read and encode as base64 for vision AI
                         try:
-                            image_bytes = await file.read()
-                            import base64
-                            image_data = base64.b64encode(image_bytes).decode('utf-8')
+                            if file_size > _OFFLOAD_THRESHOLD:
+                                # Large images would stall the event loop while encoding
+                                image_data = (await asyncio.to_thread(base64.b64encode, buf)).decode('utf-8')
+                            else:
+                                image_data = base64.b64encode(buf).decode('utf-8')
                             enhanced_message += f"\n\n[Image attached: {safe_filename} - analyzing with vision AI]"
                         except Exception as e:
-                            logger.warning(f"Failed to process image file {safe_filename}: {e}")
+                            logger.warning("Failed to process image file %s: %s", safe_filename, e)
                             enhanced_message += f"\n\n[Image file: {safe_filename} - could not process]"
                     
                     elif file_type.startswith('text/'):
                         # For text files, try to read content
                         try:
-                            content = await file.read()
-                            content_str = content.decode('utf-8', errors='ignore')[:2000]  # Limit content
+                            # Only the first 2000 characters are used - decode at most 4 bytes per char
+                            content_str = buf[:8000].decode('utf-8', errors='ignore')[:2000]  # Limit content
                             enhanced_message += f"\n\n[Text File: {safe_filename}]\n{content_str}"
                         except Exception as e:
-                            logger.warning(f"Failed to read text file {safe_filename}: {e}")
+                            logger.warning("Failed to read text file %s: %s", safe_filename, e)
                             enhanced_message += f"\n\n[Text File: {safe_filename} - could not read content]"
                     
                     else:
@@ -528,35 +952,18 @@ async def chat_with_files(
                         enhanced_message += f"\n\n[File attached: {safe_filename} ({file_type})]"
 
                 except ValidationError as e:
-                    logger.warning(f"File validation failed for {file.filename}: {e}")
+                    logger.warning("File validation failed for %s: %s", file.filename, e)
                     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
                 except Exception as e:
-                    logger.error(f"Error processing file {file.filename}: {e}")
+                    logger.error("Error processing file %s: %s", file.filename, e)
                     enhanced_message += f"\n\n[File: {file.filename} - processing failed]"
 
-        # Get conversation context (last 10 messages from this session)
-        recent_messages = await session_manager.get_recent_messages(user_id, session_id, limit=10)
-
-        # Build conversation context
-        conversation_context = []
-        for msg in recent_messages:
-            conversation_context.append({
-                "role": msg.role,
-                "content": msg.content
-            })
-
-        # Add current message with file content
-        conversation_context.append({
-            "role": "user",
-            "content": enhanced_message
-        })
-
-        # Create enhanced prompt with context
-        if conversation_context:
-            context_prompt = "\n".join([f"{msg['role']}: {msg['content']}" for msg in conversation_context])
-            enhanced_prompt = f"Conversation context:\n{context_prompt}\n\nCurrent message: {enhanced_message}"
-        else:
-            enhanced_prompt = enhanced_message
+        # Build the context prompt in one pass over the history, ending with
+        # the current message with file content
+        context_lines = [f"{msg.role}: {msg.content}" for msg in recent_messages]
+        context_lines.append(f"user: {enhanced_message}")
+        context_prompt = "\n".join(context_lines)
+        enhanced_prompt = f"Conversation context:\n{context_prompt}\n\nCurrent message: {enhanced_message}"
 
         # Determine conversation type based on content and attachments
         conversation_type = "general"
@@ -593,7 +1000,6 @@ async def chat_with_files(
             model_used=resp.get("model"),
             provider_used=resp.get("provider")
         )
-        user_message_id = await session_manager.add_message(user_message)
 
         # Store AI response in MongoDB
         ai_message = MessageDocument(
@@ -608,15 +1014,12 @@ async def chat_with_files(
                 "model": resp.get("model")  # Add model to metadata for frontend display
             }
         )
-        ai_message_id = await session_manager.add_message(ai_message)
+        user_message_id, ai_message_id = await session_manager.add_messages([user_message, ai_message])
 
-        logger.info(f"Chat response with files generated and stored for user {user_id}")
+        logger.info("Chat response with files generated and stored for user %s", user_id)
 
         # 🧠 AUTOMATIC MEMORY EXTRACTION: Extract with throttling
         try:
-            import asyncio
-            from datetime import timedelta
-            
             session = await session_manager.get_session(user_id, session_id)
             
             # Ensure extraction fields are initialized
@@ -630,7 +1033,7 @@ async def chat_with_files(
             if session.last_memory_extraction is None:
                 should_extract = messages_since_extraction >= 2  # Lowered for testing
                 reason = "initial extraction"
-                logger.info(f"🧠 Memory extraction check (with-files): {messages_since_extraction} messages, threshold: 2, should_extract: {should_extract}")
+                logger.info("🧠 Memory extraction check (with-files): %s messages, threshold: 2, should_extract: %s", messages_since_extraction, should_extract)
             elif messages_since_extraction >= 15:
                 should_extract = True
                 reason = f"{messages_since_extraction} new messages"
@@ -646,9 +1049,7 @@ async def chat_with_files(
                         message_limit=20
                     )
                 )
-                from app.db.mongodb import mongodb_manager
-                sessions_collection = mongodb_manager.get_collection("sessions")
-                from bson import ObjectId
+                sessions_collection = session_manager.sessions_collection
                 await sessions_collection.update_one(
                     {"session_id": session_id, "user_id": user_id},
                     {
@@ -658,11 +1059,14 @@ async def chat_with_files(
                         }
                     }
                 )
-                logger.info(f"🧠 Triggered memory extraction for file session {session_id} ({reason})")
+                logger.info("🧠 Triggered memory extraction for file session %s (%s)", session_id, reason)
             else:
-                logger.debug(f"🧠 Skipped memory extraction (throttled): {messages_since_extraction} messages")
+                logger.debug("🧠 Skipped memory extraction (throttled): %s messages", messages_since_extraction)
         except Exception as e:
-            logger.warning(f"Memory extraction trigger failed (non-critical): {e}")
+            logger.warning("Memory extraction trigger failed (non-critical): %s", e)
+
+        # After the extraction bookkeeping so the next list read sees every write of this turn
+        await invalidate_sessions_cache(user_id)
 
         return ChatResponse(
             message_id=ai_message_id,
@@ -679,7 +1083,7 @@ async def chat_with_files(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Chat with files error for user {user_id}: {e}")
+        logger.error("Chat with files error for user %s: %s", user_id, e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Chat failed")
 
 
@@ -693,28 +1097,17 @@ async def get_conversation_history(
     """Get conversation history for a session."""
     try:
         # Validate session_id format
-        import re
-        uuid_pattern = r'^[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}$'
-        if not re.match(uuid_pattern, session_id, re.IGNORECASE):
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid session ID format")
+        _validate_session_id(session_id)
 
         # Get messages from MongoDB
         messages = await session_manager.get_messages(user_id, session_id, limit=limit)
 
-        return {
-            "session_id": session_id,
-            "messages": [
-                {
-                    "id": str(msg.id),
-                    "role": msg.role,
-                    "content": msg.content,
-                    "created_at": msg.created_at.isoformat(),
-                    "attachments": msg.attachments,
-                    "metadata": msg.metadata
-                }
-                for msg in messages
-            ]
-        }
+        # Serialized straight to bytes so FastAPI skips jsonable_encoder over every message
+        body = (
+            b'{"session_id":' + orjson.dumps(session_id) + b',"messages":'
+            + _MESSAGES_ADAPTER.dump_json(messages, include=_HISTORY_INCLUDE) + b'}'
+        )
+        return Response(content=body, media_type="application/json")
 
     except HTTPException:
         raise
@@ -748,7 +1141,20 @@ async def get_user_sessions(
             if len(query) > 200:  # Reasonable limit for search queries
                 raise HTTPException(status_code=400, detail="Search query too long (max 200 characters)")
             # Remove potentially harmful characters
-            query = re.sub(r'[<>]', '', query)
+            query = _QUERY_STRIP_RE.sub('', query)
+
+        # Serve repeated page requests (polling, pagination) from Redis
+        redis = get_redis()
+        cache_key = sessions_cache_key(
+            user_id, query, search_mode, date_from, date_to, status, sort_by, sort_order, limit
+        )
+        if redis is not None:
+            try:
+                cached = await redis.get(cache_key)
+                if cached is not None:
+                    return Response(content=cached, media_type="application/json")
+            except Exception as e:
+                logger.warning(f"Sessions cache read failed for user {user_id}: {e}")
 
         # Validate date formats
         date_from_parsed = None
@@ -788,23 +1194,13 @@ async def get_user_sessions(
             date_to=date_to_parsed
         )
 
-        return {
-            "sessions": [
-                {
-                    "session_id": session.session_id,
-                    "title": session.title,
-                    "category": session.category,
-                    "tags": session.tags,
-                    "status": session.status,
-                    "is_pinned": session.is_pinned,
-                    "is_favorite": session.is_favorite,
-                    "message_count": session.message_count,
-                    "last_activity": session.last_activity.isoformat(),
-                    "created_at": session.created_at.isoformat()
-                }
-                for session in sessions
-            ]
-        }
+        body = b'{"sessions":' + _SESSIONS_ADAPTER.dump_json(sessions, include=_SESSION_LIST_INCLUDE) + b'}'
+        if redis is not None:
+            try:
+                await redis.setex(cache_key, _SESSIONS_CACHE_TTL, body)
+            except Exception as e:
+                logger.warning(f"Sessions cache write failed for user {user_id}: {e}")
+        return Response(content=body, media_type="application/json")
 
     except HTTPException:
         raise
@@ -829,10 +1225,7 @@ async def delete_conversation_session(
     """Delete a conversation session and all its messages."""
     try:
         # Validate session_id format
-        import re
-        uuid_pattern = r'^[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}$'
-        if not re.match(uuid_pattern, session_id, re.IGNORECASE):
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid session ID format")
+        _validate_session_id(session_id)
 
         logger.info(f"Session deletion request for session {session_id} by user {user_id}")
 
@@ -842,6 +1235,7 @@ async def delete_conversation_session(
             logger.warning(f"Session deletion failed: session {session_id} not found for user {user_id}")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
 
+        await invalidate_sessions_cache(user_id)
         logger.info(f"Session {session_id} deleted successfully for user {user_id}")
         return {"message": "Session deleted successfully"}
 
@@ -868,10 +1262,7 @@ async def update_conversation_session(
     """Update conversation session metadata."""
     try:
         # Validate session_id format
-        import re
-        uuid_pattern = r'^[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}$'
-        if not re.match(uuid_pattern, session_id, re.IGNORECASE):
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid session ID format")
+        _validate_session_id(session_id)
 
         logger.info(f"Session update request for session {session_id} by user {user_id}")
 
@@ -881,6 +1272,7 @@ async def update_conversation_session(
             logger.warning(f"Session update failed: session {session_id} not found for user {user_id}")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
 
+        await invalidate_sessions_cache(user_id)
         logger.info(f"Session {session_id} updated successfully for user {user_id}")
         return {"message": "Session updated successfully", "session_id": session_id}
     except HTTPException:
@@ -899,10 +1291,7 @@ async def get_conversation_summary(
     """Get summary statistics for a conversation session."""
     try:
         # Validate session_id format
-        import re
-        uuid_pattern = r'^[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}$'
-        if not re.match(uuid_pattern, session_id, re.IGNORECASE):
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid session ID format")
+        _validate_session_id(session_id)
 
         logger.info(f"Session summary request for session {session_id} by user {user_id}")
 
@@ -928,77 +1317,75 @@ async def export_conversation(
     user_id: str = Depends(get_current_user),
     session_manager: SessionManager = Depends(get_session_manager)
 ):
-    """Export conversation in specified format."""
+    """Export conversation in specified format, streamed line by line."""
     try:
         # Validate session_id format
-        import re
-        uuid_pattern = r'^[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}$'
-        if not re.match(uuid_pattern, session_id, re.IGNORECASE):
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid session ID format")
+        _validate_session_id(session_id)
 
         logger.info(f"Conversation export request for session {session_id} by user {user_id}")
 
-        # Get messages from MongoDB
-        messages = await session_manager.get_messages(user_id, session_id)
+        # Check the session up front - once streaming starts we can no longer send a 404
+        session = await session_manager.get_session(user_id, session_id)
 
-        if not messages:
+        if not session:
             logger.warning(f"Export failed: session {session_id} not found for user {user_id}")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
 
+        exported_at = datetime.utcnow()
+        messages = session_manager.iter_messages(user_id, session_id)
+
+        header = {
+            "session_id": session_id,
+            "exported_at": exported_at,
+            "message_count": session.message_count
+        }
+
+        export_fields = _EXPORT_FIELDS_FULL if request.include_metadata else _EXPORT_FIELDS_BASIC
+
+        def _export_item(msg: MessageDocument) -> Dict[str, Any]:
+            return msg.model_dump(include=export_fields)
+
         # Format the conversation based on requested format
         if request.format == ExportFormat.json:
-            conversation_data = {
-                "session_id": session_id,
-                "exported_at": datetime.utcnow().isoformat(),
-                "message_count": len(messages),
-                "messages": [
-                    {
-                        "id": str(msg.id),
-                        "role": msg.role,
-                        "content": msg.content,
-                        "created_at": msg.created_at.isoformat(),
-                        "timestamp": msg.created_at.timestamp(),
-                        "attachments": msg.attachments,
-                        "metadata": msg.metadata
-                    } for msg in messages
-                ] if request.include_metadata else [
-                    {
-                        "role": msg.role,
-                        "content": msg.content
-                    } for msg in messages
-                ]
-            }
-            return conversation_data
+            media_type, extension = "application/x-ndjson", "ndjson"
+
+            async def _gen():
+                yield orjson.dumps(header, option=_EXPORT_JSON_OPTS) + b"\n"
+                async for msg in messages:
+                    yield orjson.dumps(_export_item(msg), option=_EXPORT_JSON_OPTS) + b"\n"
+
+        elif request.format == ExportFormat.bson:
+            # Concatenated BSON documents (header first), the same layout mongodump uses
+            media_type, extension = "application/bson", "bson"
+
+            async def _gen():
+                yield bson.encode(header)
+                async for msg in messages:
+                    yield bson.encode(_export_item(msg))
 
         elif request.format == ExportFormat.txt:
-            lines = [f"Conversation Export - Session: {session_id}"]
-            lines.append(f"Exported at: {datetime.utcnow().isoformat()}")
-            lines.append(f"Total messages: {len(messages)}")
-            lines.append("-" * 50)
-
-            for msg in messages:
-                timestamp = msg.created_at.strftime("%Y-%m-%d %H:%M:%S")
-                lines.append(f"[{timestamp}] {msg.role.title()}: {msg.content}")
-                lines.append("")
-
-            return {"format": "text", "content": "\n".join(lines)}
-
-        elif request.format == ExportFormat.markdown:
-            lines = [f"# Conversation Export\n"]
-            lines.append(f"**Session ID:** {session_id}")
-            lines.append(f"**Exported at:** {datetime.utcnow().isoformat()}")
-            lines.append(f"**Total messages:** {len(messages)}\n")
-            lines.append("---\n")
-
-            for msg in messages:
-                timestamp = msg.created_at.strftime("%Y-%m-%d %H:%M:%S")
-                role_emoji = "👤" if msg.role == "user" else "🤖"
-                lines.append(f"**{role_emoji} {msg.role.title()}** ({timestamp}):")
-                lines.append(f"{msg.content}\n")
-
-            return {"format": "markdown", "content": "\n".join(lines)}
-
-        logger.info(f"Conversation exported successfully for session {session_id}")
+            media_type, extension = "text/plain", "txt"
+
+            async def _gen():
+                yield _TXT_EXPORT_HEADER.format(sid=session_id, ts=exported_at.isoformat(), n=session.message_count)
+                async for msg in messages:
+                    yield f"[{msg.created_at:%Y-%m-%d %H:%M:%S}] {msg.role.title()}: {msg.content}\n\n"
+
+        else:
+            media_type, extension = "text/markdown", "md"
+
+            async def _gen():
+                yield _MD_EXPORT_HEADER.format(sid=session_id, ts=exported_at.isoformat(), n=session.message_count)
+                async for msg in messages:
+                    yield f"**{_ROLE_EMOJI.get(msg.role, _ROLE_EMOJI['assistant'])} {msg.role.title()}** ({msg.created_at:%Y-%m-%d %H:%M:%S}):\n{msg.content}\n\n"
+
+        logger.info(f"Streaming conversation export for session {session_id} as {request.format.value}")
+
+        return StreamingResponse(
+            _gen(),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="conversation-{session_id}.{extension}"'}
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -1019,55 +1406,46 @@ async def bulk_session_operations(
         if not request.session_ids:
             raise HTTPException(status_code=400, detail="No session IDs provided")
 
-        # Validate that all requested sessions exist and belong to the user
-        user_sessions = []
-        for session_id in request.session_ids:
-            session = await session_manager.get_session(user_id, session_id)
-            if not session:
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"Session {session_id} not found or does not belong to user"
-                )
-            user_sessions.append(session)
+        # Validate that all requested sessions exist and belong to the user (one query)
+        found = {
+            session.session_id: session
+            for session in await session_manager.get_sessions_bulk(user_id, request.session_ids)
+        }
+        missing = [session_id for session_id in request.session_ids if session_id not in found]
+        if missing:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Session {', '.join(missing)} not found or does not belong to user"
+            )
+        user_sessions = [found[session_id] for session_id in request.session_ids]
 
-        results = []
-        
+        session_ids = list(found)
+
+        # One server-side write covers every session in the request
         if request.operation == "archive":
-            for session in user_sessions:
-                success = await session_manager.archive_session(user_id, session.session_id)
-                results.append({"session_id": session.session_id, "success": success})
-                
+            # Archiving an already-archived session still succeeds, as with archive_session
+            affected = await session_manager.bulk_archive(user_id, session_ids)
         elif request.operation == "delete":
-            for session in user_sessions:
-                success = await session_manager.delete_session(user_id, session.session_id)
-                results.append({"session_id": session.session_id, "success": success})
-                
-        elif request.operation == "tag":
+            affected = await session_manager.bulk_delete(user_id, session_ids)
+        elif request.operation in ("tag", "untag"):
             if not request.tag:
-                raise HTTPException(status_code=400, detail="Tag name required for tag operation")
-            for session in user_sessions:
-                try:
-                    success = await session_manager.tag_session(user_id, session.session_id, request.tag)
-                    results.append({"session_id": session.session_id, "success": success})
-                except Exception as e:
-                    logger.error(f"Error tagging session {session.session_id}: {e}")
-                    results.append({"session_id": session.session_id, "success": False, "error": str(e)})
-                
-        elif request.operation == "untag":
-            if not request.tag:
-                raise HTTPException(status_code=400, detail="Tag name required for untag operation")
-            for session in user_sessions:
-                try:
-                    success = await session_manager.untag_session(user_id, session.session_id, request.tag)
-                    results.append({"session_id": session.session_id, "success": success})
-                except Exception as e:
-                    logger.error(f"Error untagging session {session.session_id}: {e}")
-                    results.append({"session_id": session.session_id, "success": False, "error": str(e)})
-                
+                raise HTTPException(status_code=400, detail=f"Tag name required for {request.operation} operation")
+            operation = session_manager.bulk_tag if request.operation == "tag" else session_manager.bulk_untag
+            affected = await operation(user_id, session_ids, request.tag)
         else:
             raise HTTPException(status_code=400, detail=f"Unsupported operation: {request.operation}")
 
-        successful = sum(1 for r in results if r["success"])
+        if affected < len(session_ids):
+            # Sessions were validated above, so a shortfall means they went away concurrently
+            logger.warning(
+                f"Bulk {request.operation} affected {affected} of {len(session_ids)} sessions for user {user_id}"
+            )
+
+        # The write either covers every validated session or raises, so each one succeeded
+        results = [{"session_id": session.session_id, "success": True} for session in user_sessions]
+
+        successful = len(results)
+        await invalidate_sessions_cache(user_id)
         logger.info(f"Bulk operation completed: {successful}/{len(results)} successful")
         
         return {
@@ -1103,18 +1481,14 @@ async def chat_stream(
     Stream AI responses in real-time using Server-Sent Events (SSE).
     NOW WITH TRUE TOKEN-BY-TOKEN STREAMING!
     """
-    from fastapi.responses import StreamingResponse
-    from app.services.ai_provider_streaming import create_streaming_provider
-    from app.services.function_calling import FunctionCallingService
-    import json
-    import asyncio
-    
+    background = BackgroundTasks()
+
     async def generate_stream():
         try:
             logger.info(f"TRUE STREAMING: Chat request from user {user_id}: {req.message[:50]}...")
 
             if not req.message:
-                yield f"data: {json.dumps({'type': 'error', 'error': 'Message is required'})}\n\n"
+                yield _sse({'type': 'error', 'error': 'Message is required'})
                 return
 
             # Get or create session
@@ -1124,16 +1498,19 @@ async def chat_stream(
             if session_id:
                 session = await session_manager.get_session(user_id, session_id)
                 if not session:
-                    session_req = SessionCreateRequest(title=f"Chat {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}")
+                    session_req = SessionCreateRequest(title=_session_title("Chat"))
                     session = await session_manager.create_session(user_id, session_req)
                     session_id = session.session_id
+                    await invalidate_sessions_cache(user_id)
             else:
-                session_req = SessionCreateRequest(title=f"Chat {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}")
+                session_req = SessionCreateRequest(title=_session_title("Chat"))
                 session = await session_manager.create_session(user_id, session_req)
                 session_id = session.session_id
+                # The stream can still end early, so don't leave the new session to finalize_turn
+                await invalidate_sessions_cache(user_id)
 
             # Send session_id first
-            yield f"data: {json.dumps({'type': 'session_id', 'session_id': session_id})}\n\n"
+            yield _sse({'type': 'session_id', 'session_id': session_id})
 
             # Get conversation context (moved before memory retrieval)
             recent_messages = await session_manager.get_recent_messages(user_id, session_id, limit=10)
@@ -1162,7 +1539,7 @@ async def chat_stream(
                         for mem in relevant_memories
                     ]
                 }
-                yield f"data: {json.dumps(memory_info)}\n\n"
+                yield _sse(memory_info)
             
             # Format memories as context
             memory_context = ""
@@ -1176,8 +1553,8 @@ async def chat_stream(
             if memory_context:
                 prompt_parts.append(f"What I know about you:\n{memory_context}\n")
             
-            if len(conversation_context) > 1:
-                context_prompt = "\n".join([f"{msg['role']}: {msg['content']}" for msg in conversation_context[:-1]])
+            if recent_messages:
+                context_prompt = "\n".join(f"{msg.role}: {msg.content}" for msg in recent_messages)
                 prompt_parts.append(f"Conversation history:\n{context_prompt}")
             
             prompt_parts.append(f"Current message: {req.message}")
@@ -1204,7 +1581,7 @@ async def chat_stream(
                 routing_metadata = routing_decision
                 
                 # Send routing info to client
-                yield f"data: {json.dumps({'type': 'routing', 'routing': routing_metadata})}\n\n"
+                yield _sse({'type': 'routing', 'routing': routing_metadata})
                 
                 logger.info(
                     f"Smart Router selected: {selected_model} | "
@@ -1224,17 +1601,18 @@ async def chat_stream(
                 model_used=selected_model,
                 provider_used=None
             )
-            user_message_id = await session_manager.add_message(user_message)
+            async def store_user_message():
+                message_id = await session_manager.add_message(user_message)
+                # Runs to completion even if the stream stops before finalize_turn
+                await invalidate_sessions_cache(user_id)
+                return message_id
+
+            # Persist off the critical path to the first token; awaited before the reply is stored
+            user_message_task = asyncio.create_task(store_user_message())
+            user_message_task.add_done_callback(_log_failed_user_message)
 
             # Check if model supports function calling
-            model_supports_functions = selected_model and any(
-                model_prefix in selected_model.lower() 
-                for model_prefix in [
-                    "gpt-oss", "gpt-4", "gpt-3.5", "claude", "gemini", "mistral", 
-                    "command-r", "deepseek", "qwen", "llama-3.1", "llama-3.2", "grok",
-                    "nemotron", "kimi", "moonshot", "openai", "x-ai", "xai"
-                ]
-            )
+            model_supports_functions = bool(selected_model) and _supports_function_calling(selected_model)
 
             # Enable tools for supported models
             tools = AVAILABLE_TOOLS if model_supports_functions else None
@@ -1242,7 +1620,7 @@ async def chat_stream(
             if model_supports_functions:
                 logger.info(f"Model {selected_model} supports function calling. Tools enabled: {len(AVAILABLE_TOOLS)} tools")
                 # Send tools info to client
-                yield f"data: {json.dumps({'type': 'tools_enabled', 'tools_count': len(AVAILABLE_TOOLS)})}\n\n"
+                yield _sse({'type': 'tools_enabled', 'tools_count': len(AVAILABLE_TOOLS)})
 
             # CRITICAL: Groq and Gemini don't support function calling in streaming mode
             # If these models are selected AND tools are needed, fallback to non-streaming endpoint
@@ -1253,114 +1631,64 @@ async def chat_stream(
             
             is_gemini_model = selected_model and "gemini" in selected_model.lower()
             
-            # Fallback to non-streaming if tools are needed with incompatible providers
+            # Resolve tool calls with one non-streaming request for incompatible providers,
+            # then stream the final answer token by token without tools
+            prefetched_reply = None
             if (is_groq_model or is_gemini_model) and tools:
                 provider_name_log = "Groq" if is_groq_model else "Gemini"
                 logger.warning(f"{provider_name_log} model {selected_model} with function calling detected - {provider_name_log} doesn't support tools in streaming mode")
-                logger.info(f"Falling back to non-streaming mode for {provider_name_log} with function calling")
+                logger.info(f"Resolving function calls non-streaming for {provider_name_log} before streaming the reply")
                 
-                # Use the non-streaming endpoint logic
-                from app.services.ai_provider import generate_response
+                # Notify client about the non-streaming tool round
+                yield _sse({'type': 'info', 'message': 'Resolving function calls before streaming'})
                 
-                # Notify client about non-streaming mode
-                yield f"data: {json.dumps({'type': 'info', 'message': 'Using non-streaming mode for function calling'})}\n\n"
+                resp = await generate_response(
+                    enhanced_prompt,
+                    request_type=conversation_type.value,
+                    model=selected_model,
+                    max_tokens=req.max_tokens or 1000,
+                    temperature=req.temperature or 0.7,
+                    tools=tools
+                )
                 
-                # Generate response using non-streaming provider (with function calling support)
-                max_iterations = 2
-                iteration = 0
-                final_response_text = ""
+                # Check if AI wants to call a function
+                tool_calls = resp.get("tool_calls")
                 
-                while iteration < max_iterations:
-                    iteration += 1
-                    
-                    resp = await generate_response(
-                        enhanced_prompt,
-                        request_type=conversation_type.value,
-                        model=selected_model,
-                        max_tokens=req.max_tokens or 1000,
-                        temperature=req.temperature or 0.7,
-                        tools=tools
-                    )
-                    
-                    # Check if AI wants to call a function
-                    tool_calls = resp.get("tool_calls")
+                if tool_calls:
+                    logger.info(f"AI requested {len(tool_calls)} tool calls: {[tc.get('function', {}).get('name') for tc in tool_calls]}")
                     
-                    if tool_calls:
-                        logger.info(f"AI requested {len(tool_calls)} tool calls: {[tc.get('function', {}).get('name') for tc in tool_calls]}")
+                    # Execute all requested function calls
+                    for tool_call in tool_calls:
+                        function_name = tool_call.get("function", {}).get("name")
+                        function_args_raw = tool_call.get("function", {}).get("arguments", "{}")
                         
-                        # Execute all requested function calls
-                        for tool_call in tool_calls:
-                            function_name = tool_call.get("function", {}).get("name")
-                            function_args_raw = tool_call.get("function", {}).get("arguments", "{}")
-                            
-                            # Parse arguments
-                            try:
-                                if isinstance(function_args_raw, dict):
-                                    function_args = function_args_raw
-                                elif isinstance(function_args_raw, str):
-                                    function_args = json.loads(function_args_raw)
-                                else:
-                                    function_args = {}
-                            except json.JSONDecodeError:
+                        # Parse arguments
+                        try:
+                            if isinstance(function_args_raw, dict):
+                                function_args = function_args_raw
+                            elif isinstance(function_args_raw, str):
+                                function_args = orjson.loads(function_args_raw)
+                            else:
                                 function_args = {}
-                            
-                            # Execute the function
-                            result = await function_calling_service.execute_function(
-                                function_name, 
-                                function_args
-                            )
-                            
-                            # Notify client about tool call
-                            yield f"data: {json.dumps({'type': 'tool_call', 'function': function_name, 'result': result})}\n\n"
-                            
-                            # Add function result to prompt for next iteration
-                            enhanced_prompt += f"\n\nFunction {function_name} returned: {result}\n\nPlease provide a natural response based on this information."
+                        except orjson.JSONDecodeError:
+                            function_args = {}
+                        
+                        # Execute the function
+                        result = await function_calling_service.execute_function(
+                            function_name, 
+                            function_args
+                        )
+                        
+                        # Notify client about tool call
+                        yield _sse({'type': 'tool_call', 'function': function_name, 'result': result})
+                        
+                        # Add function result to prompt for the streamed answer
+                        enhanced_prompt += f"\n\nFunction {function_name} returned: {result}\n\nPlease provide a natural response based on this information."
                     
-                    else:
-                        # No function calls, we have the final response
-                        final_response_text = resp.get("reply", "")
-                        usage_data = resp.get("usage")
-                        provider_name = resp.get("provider")
-                        break
-                
-                # Stream the final response word-by-word for better UX
-                words = final_response_text.split()
-                accumulated = ""
-                for i, word in enumerate(words):
-                    accumulated += word + (" " if i < len(words) - 1 else "")
-                    yield f"data: {json.dumps({'type': 'chunk', 'content': word + ' ', 'accumulated': accumulated})}\n\n"
-                    await asyncio.sleep(0.05)  # Small delay for visual effect
-                
-                # Mark as complete
-                yield f"data: {json.dumps({'type': 'done', 'accumulated': final_response_text, 'usage': usage_data, 'provider': provider_name})}\n\n"
-                
-                # Save message to database
-                await session_manager.add_message(
-                    user_id=user_id,
-                    session_id=session_id,
-                    role="user",
-                    content=req.message
-                )
-                
-                await session_manager.add_message(
-                    user_id=user_id,
-                    session_id=session_id,
-                    role="assistant",
-                    content=final_response_text,
-                    model=selected_model,
-                    tokens_used=usage_data.get("total_tokens", 0) if usage_data else 0
-                )
-                
-                # Extract and save memories
-                await memory_service.extract_and_save_memories(
-                    user_id=user_id,
-                    user_message=req.message,
-                    assistant_message=final_response_text,
-                    session_id=session_id
-                )
-                
-                yield "data: [DONE]\n\n"
-                return
+                    tools = None
+                else:
+                    # No function calls - the reply is already complete
+                    prefetched_reply = resp
 
             # Create streaming provider with automatic fallback
             try:
@@ -1371,98 +1699,90 @@ async def chat_stream(
                 logger.info("Falling back to Groq llama-3.1-8b-instant")
                 selected_model = "llama-3.1-8b-instant"
                 streaming_provider = await create_streaming_provider(selected_model)
-                yield f"data: {json.dumps({'type': 'fallback', 'message': 'Primary model unavailable, using fast fallback model', 'model': selected_model})}\n\n"
+                yield _sse({'type': 'fallback', 'message': 'Primary model unavailable, using fast fallback model', 'model': selected_model})
             
             # Generate TRUE token-by-token streaming response
             accumulated_text = ""
             tool_calls_received = []
             usage_data = None
             provider_name = None
+            stream_failed = False
             
-            try:
-                async for chunk in streaming_provider.generate_stream(
+            async def consume_stream(provider, label: str):
+                """Relay a provider stream as SSE frames, recording its final state."""
+                nonlocal accumulated_text, tool_calls_received, usage_data, provider_name, stream_failed
+                
+                async for chunk in provider.generate_stream(
                     prompt=enhanced_prompt,
                     tools=tools,
                     max_tokens=req.max_tokens or 1000,
                     temperature=req.temperature or 0.7
                 ):
-                    chunk_type = chunk.get("type")
+                    chunk_type = chunk["type"]
                     
                     if chunk_type == "content":
                         # Stream text content token-by-token
-                        content = chunk.get("content", "")
-                        accumulated_text = chunk.get("accumulated", "")
+                        content, accumulated_text = chunk["content"], chunk["accumulated"]
                         
-                        yield f"data: {json.dumps({'type': 'chunk', 'content': content, 'accumulated': accumulated_text})}\n\n"
+                        yield _sse_chunk(content, accumulated_text)
                     
                     elif chunk_type == "tool_call":
-                        # Tool call detected during streaming
-                        tool_call = chunk.get("tool_call")
-                        tool_calls_received.append(tool_call)
-                        
-                        yield f"data: {json.dumps({'type': 'tool_call', 'tool_call': tool_call})}\n\n"
+                        # Tool call detected during streaming; announced to the client
+                        # once execution starts so fast calls can share a single frame
+                        tool_calls_received.append(chunk["tool_call"])
                     
                     elif chunk_type == "done":
                         # Streaming complete
-                        accumulated_text = chunk.get("accumulated", accumulated_text)
-                        tool_calls_received = chunk.get("tool_calls") or tool_calls_received
-                        usage_data = chunk.get("usage")
-                        provider_name = chunk.get("provider")
+                        accumulated_text = chunk["accumulated"]
+                        tool_calls_received = chunk["tool_calls"] or tool_calls_received
+                        usage_data = chunk["usage"]
+                        provider_name = chunk["provider"]
                         
-                        logger.info(f"Streaming completed: {len(accumulated_text)} chars, {len(tool_calls_received) if tool_calls_received else 0} tool calls")
+                        logger.info(f"{label} completed: {len(accumulated_text)} chars, {len(tool_calls_received) if tool_calls_received else 0} tool calls")
                     
                     elif chunk_type == "error":
                         # Error during streaming
-                        error_msg = chunk.get("error", "Unknown streaming error")
-                        logger.error(f"Streaming error: {error_msg}")
-                        yield f"data: {json.dumps({'type': 'error', 'error': error_msg})}\n\n"
+                        error_msg = chunk["error"]
+                        logger.error(f"{label} error: {error_msg}")
+                        yield _sse({'type': 'error', 'error': error_msg})
+                        stream_failed = True
                         return
             
+            try:
+                if prefetched_reply is not None:
+                    accumulated_text = prefetched_reply.get("reply", "")
+                    usage_data = prefetched_reply.get("usage")
+                    provider_name = prefetched_reply.get("provider")
+                    yield _sse_chunk(accumulated_text, accumulated_text)
+                else:
+                    async for frame in consume_stream(streaming_provider, "Streaming"):
+                        yield frame
+            
             except httpx.HTTPStatusError as http_err:
                 # Catch 502 and other HTTP errors, try fallback
                 if "502" in str(http_err) or "Bad Gateway" in str(http_err):
                     logger.error(f"OpenRouter service unavailable (502), falling back to Groq")
-                    yield f"data: {json.dumps({'type': 'fallback', 'message': 'Service temporarily unavailable, switching to backup...', 'model': 'llama-3.1-8b-instant'})}\n\n"
+                    yield _sse({'type': 'fallback', 'message': 'Service temporarily unavailable, switching to backup...', 'model': 'llama-3.1-8b-instant'})
                     
                     # Fallback to Groq
                     selected_model = "llama-3.1-8b-instant"
                     streaming_provider = await create_streaming_provider(selected_model)
                     
                     # Retry with Groq
-                    async for chunk in streaming_provider.generate_stream(
-                        prompt=enhanced_prompt,
-                        tools=tools,
-                        max_tokens=req.max_tokens or 1000,
-                        temperature=req.temperature or 0.7
-                    ):
-                        chunk_type = chunk.get("type")
-                        
-                        if chunk_type == "content":
-                            content = chunk.get("content", "")
-                            accumulated_text = chunk.get("accumulated", "")
-                            yield f"data: {json.dumps({'type': 'chunk', 'content': content, 'accumulated': accumulated_text})}\n\n"
-                        
-                        elif chunk_type == "done":
-                            accumulated_text = chunk.get("accumulated", accumulated_text)
-                            tool_calls_received = chunk.get("tool_calls") or tool_calls_received
-                            usage_data = chunk.get("usage")
-                            provider_name = chunk.get("provider")
-                            logger.info(f"Fallback streaming completed: {len(accumulated_text)} chars")
-                        
-                        elif chunk_type == "error":
-                            error_msg = chunk.get("error", "Unknown streaming error")
-                            logger.error(f"Fallback streaming error: {error_msg}")
-                            yield f"data: {json.dumps({'type': 'error', 'error': error_msg})}\n\n"
-                            return
+                    async for frame in consume_stream(streaming_provider, "Fallback streaming"):
+                        yield frame
                 else:
                     # Other HTTP errors
                     logger.error(f"HTTP error during streaming: {http_err}")
-                    yield f"data: {json.dumps({'type': 'error', 'error': str(http_err)})}\n\n"
+                    yield _sse({'type': 'error', 'error': str(http_err)})
                     return
             
             except Exception as e:
                 logger.error(f"Unexpected streaming error: {e}")
-                yield f"data: {json.dumps({'type': 'error', 'error': f'An unexpected error occurred: {str(e)}'})}\n\n"
+                yield _sse({'type': 'error', 'error': f'An unexpected error occurred: {str(e)}'})
+                return
+            
+            if stream_failed:
                 return
 
             # Handle function calling if tool calls were made
@@ -1470,27 +1790,50 @@ async def chat_stream(
             tool_results = []
             
             if tool_calls_received and model_supports_functions:
-                function_service = FunctionCallingService()
                 logger.info(f"Processing {len(tool_calls_received)} function calls...")
                 
-                for tool_call in tool_calls_received:
-                    try:
+                # Execute all tool calls concurrently
+                tasks = [
+                    asyncio.create_task(function_calling_service.execute_function(
+                        tool_call.get("function", {}).get("name", ""),
+                        tool_call.get("function", {}).get("arguments", {})
+                    ))
+                    for tool_call in tool_calls_received
+                ]
+                try:
+                    _, pending = await asyncio.wait(tasks, timeout=_TOOL_COALESCE_WINDOW)
+                
+                    # Calls still running use the two-frame protocol: tool_call now, tool_result later
+                    for tool_call, task in zip(tool_calls_received, tasks):
+                        if task in pending:
+                            yield _sse({'type': 'tool_call', 'tool_call': tool_call})
+                
+                    for tool_call, task in zip(tool_calls_received, tasks):
                         func_name = tool_call.get("function", {}).get("name", "")
                         func_args = tool_call.get("function", {}).get("arguments", {})
-                        
-                        # Execute function
-                        result = await function_service.execute_function(func_name, func_args)
+                        try:
+                            result = await task
+                        except Exception as e:
+                            logger.error(f"Function call error: {e}")
+                            yield _sse({'type': 'tool_error', 'error': str(e)})
+                            continue
+                    
                         tool_results.append({
                             "name": func_name,
                             "result": result
                         })
-                        
-                        # Send tool result to client
-                        yield f"data: {json.dumps({'type': 'tool_result', 'name': func_name, 'result': result})}\n\n"
-                        
-                    except Exception as e:
-                        logger.error(f"Function call error: {e}")
-                        yield f"data: {json.dumps({'type': 'tool_error', 'error': str(e)})}\n\n"
+                    
+                        if task in pending:
+                            yield _sse({'type': 'tool_result', 'name': func_name, 'result': result})
+                        else:
+                            # Finished within the coalescing window - send call and result together
+                            yield _sse({'type': 'tool_call_complete', 'name': func_name, 'args': func_args, 'result': result})
+                
+                finally:
+                    # A closed stream (client disconnect) must not leave provider calls running
+                    for task in tasks:
+                        if not task.done():
+                            task.cancel()
                 
                 # If we got tool results, append them to the response
                 if tool_results:
@@ -1522,63 +1865,67 @@ async def chat_stream(
                     ] if relevant_memories else []
                 }
             )
+            user_message_id = await user_message_task
             ai_message_id = await session_manager.add_message(ai_message)
 
-            # 🧠 AUTOMATIC MEMORY EXTRACTION: Extract with throttling
-            try:
-                import asyncio
-                from datetime import timedelta
-                
-                session = await session_manager.get_session(user_id, session_id)
+            # Session bookkeeping does not affect the reply - run it after the
+            # response has been fully sent
+            async def finalize_turn():
+                # 🧠 AUTOMATIC MEMORY EXTRACTION: Extract with throttling
+                try:
+                    session = await session_manager.get_session(user_id, session_id)
                 
-                # Ensure extraction fields are initialized
-                if not hasattr(session, 'extraction_message_count') or session.extraction_message_count is None:
-                    session.extraction_message_count = 0
+                    # Ensure extraction fields are initialized
+                    if not hasattr(session, 'extraction_message_count') or session.extraction_message_count is None:
+                        session.extraction_message_count = 0
                 
-                messages_since_extraction = session.message_count - session.extraction_message_count
+                    messages_since_extraction = session.message_count - session.extraction_message_count
                 
-                should_extract = False
-                reason = None
-                if session.last_memory_extraction is None:
-                    should_extract = messages_since_extraction >= 2  # Lowered for testing
-                    reason = "initial extraction"
-                    logger.info(f"🧠 Memory extraction check (SSE): {messages_since_extraction} messages, threshold: 2, should_extract: {should_extract}")
-                elif messages_since_extraction >= 15:
-                    should_extract = True
-                    reason = f"{messages_since_extraction} new messages"
-                elif (datetime.utcnow() - session.last_memory_extraction) > timedelta(hours=2):
-                    should_extract = messages_since_extraction >= 3
-                    reason = "2+ hours elapsed"
+                    should_extract = False
+                    reason = None
+                    if session.last_memory_extraction is None:
+                        should_extract = messages_since_extraction >= 2  # Lowered for testing
+                        reason = "initial extraction"
+                        logger.info(f"🧠 Memory extraction check (SSE): {messages_since_extraction} messages, threshold: 2, should_extract: {should_extract}")
+                    elif messages_since_extraction >= 15:
+                        should_extract = True
+                        reason = f"{messages_since_extraction} new messages"
+                    elif (datetime.utcnow() - session.last_memory_extraction) > timedelta(hours=2):
+                        should_extract = messages_since_extraction >= 3
+                        reason = "2+ hours elapsed"
                 
-                if should_extract:
-                    asyncio.create_task(
-                        memory_service.extract_memories_from_conversation(
-                            user_id=user_id,
-                            session_id=session_id,
-                            message_limit=20
+                    if should_extract:
+                        asyncio.create_task(
+                            memory_service.extract_memories_from_conversation(
+                                user_id=user_id,
+                                session_id=session_id,
+                                message_limit=20
+                            )
                         )
-                    )
-                    from app.db.mongodb import mongodb_manager
-                    sessions_collection = mongodb_manager.get_collection("sessions")
-                    from bson import ObjectId
-                    await sessions_collection.update_one(
-                        {"session_id": session_id, "user_id": user_id},
-                        {
-                            "$set": {
-                                "last_memory_extraction": datetime.utcnow(),
-                                "extraction_message_count": session.message_count
+                        sessions_collection = session_manager.sessions_collection
+                        await sessions_collection.update_one(
+                            {"session_id": session_id, "user_id": user_id},
+                            {
+                                "$set": {
+                                    "last_memory_extraction": datetime.utcnow(),
+                                    "extraction_message_count": session.message_count
+                                }
                             }
-                        }
-                    )
-                    logger.info(f"🧠 Triggered memory extraction for streaming session {session_id} ({reason})")
-                else:
-                    logger.debug(f"🧠 Skipped memory extraction (throttled): {messages_since_extraction} messages")
-            except Exception as e:
-                logger.warning(f"Memory extraction trigger failed (non-critical): {e}")
+                        )
+                        logger.info(f"🧠 Triggered memory extraction for streaming session {session_id} ({reason})")
+                    else:
+                        logger.debug(f"🧠 Skipped memory extraction (throttled): {messages_since_extraction} messages")
+                except Exception as e:
+                    logger.warning(f"Memory extraction trigger failed (non-critical): {e}")
+
+                # Update user message with actual token count
+                if usage_data:
+                    await session_manager.update_message_tokens(user_message_id, usage_data.get("prompt_tokens"))
+
+                # Last write of the turn - only now can the list cache be refilled safely
+                await invalidate_sessions_cache(user_id)
 
-            # Update user message with actual token count
-            if usage_data:
-                await session_manager.update_message_tokens(user_message_id, usage_data.get("prompt_tokens"))
+            background.add_task(finalize_turn)
 
             # Send completion event
             completion_data = {
@@ -1591,13 +1938,12 @@ async def chat_stream(
                 "routing": routing_metadata,
                 "tool_calls": len(tool_calls_received) if tool_calls_received else 0
             }
-            yield f"data: {json.dumps(completion_data)}\n\n"
+            yield _sse(completion_data)
 
         except Exception as e:
             logger.error(f"Streaming error for user {user_id}: {e}")
-            import traceback
             traceback.print_exc()
-            yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+            yield _sse({'type': 'error', 'error': str(e)})
 
     return StreamingResponse(
         generate_stream(),
@@ -1606,7 +1952,8 @@ async def chat_stream(
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
             "X-Accel-Buffering": "no"
-        }
+        },
+        background=background
     )
 
 
@@ -1618,10 +1965,10 @@ async def add_message_reaction(
     session_manager: SessionManager = Depends(get_session_manager)
 ):
     """Add or update a reaction to a message."""
-    from bson import ObjectId
     
     try:
         logger.info(f"Reaction request from user {user_id} for message {message_id}: {request.reaction_type}")
+        oid = _to_oid(message_id)
         
         # Validate reaction type
         valid_reactions = ["like", "dislike", "love", "laugh", "confused"]
@@ -1629,40 +1976,47 @@ async def add_message_reaction(
             raise HTTPException(status_code=400, detail=f"Invalid reaction type. Must be one of: {valid_reactions}")
         
         # Get MongoDB collection
-        db = session_manager.db
-        messages_collection = db["messages"]
-        
-        # Find message
-        message = await messages_collection.find_one({"_id": ObjectId(message_id)})
-        if not message:
-            raise HTTPException(status_code=404, detail="Message not found")
-        
-        # Check if user already reacted
-        user_reactions = message.get("user_reactions", {})
-        previous_reaction = user_reactions.get(user_id)
-        
-        # Update reactions count
-        reactions = message.get("reactions", {"like": 0, "dislike": 0})
+        messages_collection = session_manager.messages_collection
         
-        # Remove previous reaction if exists
-        if previous_reaction and previous_reaction in reactions:
-            reactions[previous_reaction] = max(0, reactions.get(previous_reaction, 0) - 1)
+        user_reaction_field = f"user_reactions.{user_id}"
         
-        # Add new reaction
-        reactions[request.reaction_type] = reactions.get(request.reaction_type, 0) + 1
-        user_reactions[user_id] = request.reaction_type
-        
-        # Update message
-        await messages_collection.update_one(
-            {"_id": ObjectId(message_id)},
-            {
+        # Apply the change atomically; the filter on the previous reaction makes a
+        # concurrent change by the same user miss, in which case we re-read and retry
+        updated = None
+        for _ in range(3):
+            message = await messages_collection.find_one({"_id": oid}, {user_reaction_field: 1})
+            if not message:
+                raise HTTPException(status_code=404, detail="Message not found")
+            
+            # Check if user already reacted
+            previous_reaction = message.get("user_reactions", {}).get(user_id)
+            
+            update: Dict[str, Any] = {
                 "$set": {
-                    "reactions": reactions,
-                    "user_reactions": user_reactions,
+                    user_reaction_field: request.reaction_type,
                     "updated_at": datetime.utcnow()
                 }
             }
-        )
+            if previous_reaction != request.reaction_type:
+                inc = {f"reactions.{request.reaction_type}": 1}
+                # Remove previous reaction if exists
+                if previous_reaction:
+                    inc[f"reactions.{previous_reaction}"] = -1
+                update["$inc"] = inc
+            
+            updated = await messages_collection.find_one_and_update(
+                {"_id": oid, user_reaction_field: previous_reaction},
+                update,
+                projection={"reactions": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if updated:
+                break
+        
+        if not updated:
+            raise HTTPException(status_code=409, detail="Reaction changed concurrently, please retry")
+        
+        reactions = updated.get("reactions", {"like": 0, "dislike": 0})
         
         logger.info(f"Reaction added successfully for message {message_id}")
         return {
@@ -1685,15 +2039,18 @@ async def get_message_reactions(
     session_manager: SessionManager = Depends(get_session_manager)
 ):
     """Get reactions for a message."""
-    from bson import ObjectId
     
     try:
+        oid = _to_oid(message_id)
+        
         # Get MongoDB collection
-        db = session_manager.db
-        messages_collection = db["messages"]
+        messages_collection = session_manager.messages_collection
         
         # Find message
-        message = await messages_collection.find_one({"_id": ObjectId(message_id)})
+        message = await messages_collection.find_one(
+            {"_id": oid},
+            {"reactions": 1, f"user_reactions.{user_id}": 1}
+        )
         if not message:
             raise HTTPException(status_code=404, detail="Message not found")
         
@@ -1723,23 +2080,17 @@ async def rate_message(
     session_manager: SessionManager = Depends(get_session_manager)
 ):
     """Rate a message (1-5 stars)."""
-    from bson import ObjectId
     
     try:
         logger.info(f"Rating request from user {user_id} for message {message_id}: {request.rating} stars")
+        oid = _to_oid(message_id)
         
         # Get MongoDB collection
-        db = session_manager.db
-        messages_collection = db["messages"]
+        messages_collection = session_manager.messages_collection
         
-        # Find message
-        message = await messages_collection.find_one({"_id": ObjectId(message_id)})
-        if not message:
-            raise HTTPException(status_code=404, detail="Message not found")
-        
-        # Update rating
-        await messages_collection.update_one(
-            {"_id": ObjectId(message_id)},
+        # Update rating; the filter also checks the message belongs to the caller
+        result = await messages_collection.update_one(
+            {"_id": oid, "user_id": user_id},
             {
                 "$set": {
                     "rating": request.rating,
@@ -1747,6 +2098,8 @@ async def rate_message(
                 }
             }
         )
+        if result.matched_count == 0:
+            raise HTTPException(status_code=404, detail="Message not found")
         
         logger.info(f"Rating added successfully for message {message_id}")
         return {
@@ -1769,26 +2122,28 @@ async def create_message_branch(
     session_manager: SessionManager = Depends(get_session_manager)
 ):
     """Create a conversation branch from a specific message."""
-    from bson import ObjectId
     import uuid
     
     try:
         logger.info(f"Branch request from user {user_id} for message {message_id}")
+        oid = _to_oid(message_id)
         
         # Get MongoDB collections
-        db = session_manager.db
-        messages_collection = db["messages"]
-        sessions_collection = db["sessions"]
+        messages_collection = session_manager.messages_collection
+        sessions_collection = session_manager.sessions_collection
         
         # Find parent message
-        parent_message = await messages_collection.find_one({"_id": ObjectId(message_id)})
+        parent_message = await messages_collection.find_one({"_id": oid}, {"session_id": 1})
         if not parent_message:
             raise HTTPException(status_code=404, detail="Message not found")
         
         session_id = parent_message["session_id"]
         
         # Get session
-        session = await sessions_collection.find_one({"user_id": user_id, "session_id": session_id})
+        session = await sessions_collection.find_one(
+            {"user_id": user_id, "session_id": session_id},
+            {"branches.branch_id": 1}
+        )
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
         
@@ -1806,7 +2161,6 @@ async def create_message_branch(
             branch_id=branch_id,
             is_edited=True
         )
-        edited_message_id = await session_manager.add_message(edited_message)
         
         # Generate new AI response for the branch
         resp = await generate_response(
@@ -1828,7 +2182,6 @@ async def create_message_branch(
             model_used=resp.get("model"),
             provider_used=resp.get("provider")
         )
-        branch_ai_message_id = await session_manager.add_message(branch_ai_message)
         
         # Update session with branch metadata
         branch_metadata = {
@@ -1839,13 +2192,18 @@ async def create_message_branch(
             "message_count": 2
         }
         
-        await sessions_collection.update_one(
-            {"user_id": user_id, "session_id": session_id},
-            {
-                "$push": {"branches": branch_metadata},
-                "$set": {"active_branch_id": branch_id, "updated_at": datetime.utcnow()}
-            }
+        # Store both branch messages in one batch alongside the branch metadata update
+        (edited_message_id, branch_ai_message_id), _ = await asyncio.gather(
+            session_manager.add_messages([edited_message, branch_ai_message]),
+            sessions_collection.update_one(
+                {"user_id": user_id, "session_id": session_id},
+                {
+                    "$push": {"branches": branch_metadata},
+                    "$set": {"active_branch_id": branch_id, "updated_at": datetime.utcnow()}
+                }
+            )
         )
+        await invalidate_sessions_cache(user_id)
         
         logger.info(f"Branch {branch_id} created successfully from message {message_id}")
         return {
@@ -1873,30 +2231,40 @@ async def get_session_branches(
     """Get all branches for a session."""
     try:
         # Get MongoDB collection
-        db = session_manager.db
-        sessions_collection = db["sessions"]
-        messages_collection = db["messages"]
+        sessions_collection = session_manager.sessions_collection
+        messages_collection = session_manager.messages_collection
         
         # Get session
-        session = await sessions_collection.find_one({"user_id": user_id, "session_id": session_id})
+        session = await sessions_collection.find_one(
+            {"user_id": user_id, "session_id": session_id},
+            {"branches": 1, "active_branch_id": 1}
+        )
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
         
         branches = session.get("branches", [])
         active_branch_id = session.get("active_branch_id")
         
-        # Enrich branch data with message counts
-        enriched_branches = []
-        for branch in branches:
-            branch_messages = await messages_collection.count_documents({
-                "session_id": session_id,
-                "branch_id": branch["branch_id"]
-            })
-            enriched_branches.append({
+        # Enrich branch data with message counts, bucketed in a single aggregation
+        counts: Dict[str, int] = {}
+        if branches:
+            pipeline = [
+                {"$match": {
+                    "session_id": session_id,
+                    "branch_id": {"$in": [branch["branch_id"] for branch in branches]}
+                }},
+                {"$group": {"_id": "$branch_id", "count": {"$sum": 1}}}
+            ]
+            counts = {doc["_id"]: doc["count"] async for doc in messages_collection.aggregate(pipeline)}
+        
+        enriched_branches = [
+            {
                 **branch,
-                "message_count": branch_messages,
+                "message_count": counts.get(branch["branch_id"], 0),
                 "is_active": branch["branch_id"] == active_branch_id
-            })
+            }
+            for branch in branches
+        ]
         
         return {
             "session_id": session_id,
@@ -1922,17 +2290,16 @@ async def activate_branch(
     """Switch to a different conversation branch."""
     try:
         # Get MongoDB collection
-        db = session_manager.db
-        sessions_collection = db["sessions"]
+        sessions_collection = session_manager.sessions_collection
         
-        # Update active branch
+        # Update active branch; only matches if the branch exists on the caller's session
         result = await sessions_collection.update_one(
-            {"user_id": user_id, "session_id": session_id},
+            {"user_id": user_id, "session_id": session_id, "branches.branch_id": branch_id},
             {"$set": {"active_branch_id": branch_id, "updated_at": datetime.utcnow()}}
         )
         
-        if result.modified_count == 0:
-            raise HTTPException(status_code=404, detail="Session not found")
+        if result.matched_count == 0:
+            raise HTTPException(status_code=404, detail="Session or branch not found")
         
         logger.info(f"Branch {branch_id} activated for session {session_id}")
         return {
@@ -1970,8 +2337,26 @@ async def get_routing_stats(
         raise HTTPException(status_code=500, detail="Failed to retrieve routing statistics")
 
 
-@router.get("/models")
+@router.get(f"/{_CATALOG_FILENAME}", response_class=Response, include_in_schema=False)
+async def get_versioned_model_catalog(request: Request):
+    """
+    Serve the model catalog from a content-hashed URL.
+    
+    The URL changes whenever the catalog does, so the response is public and
+    immutable and can be served entirely from a CDN edge.
+    """
+    encoding = _negotiate_encoding(request.headers.get("accept-encoding", ""))
+    headers = {"Cache-Control": "public, max-age=31536000, immutable", "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=_CATALOG_BODIES[encoding], media_type="application/json", headers=headers)
+
+
+@router.get("/models", response_class=Response)
 async def get_available_models(
+    request: Request,
+    model_type: Optional[str] = Query(None, alias="type", description="Filter by model type, e.g. 'coding'"),
+    provider: Optional[str] = Query(None, description="Filter by provider, e.g. 'OpenRouter'"),
     user_id: str = Depends(get_current_user)
 ):
     """
@@ -1979,121 +2364,29 @@ async def get_available_models(
     
     Returns model information including ID, name, provider, and features.
     """
-    try:
-        models = [
-            # General Purpose Models
-            {
-                "id": "openai/gpt-oss-20b:free",
-                "name": "GPT-OSS 20B (Free)",
-                "provider": "OpenRouter",
-                "type": "general",
-                "supports_streaming": True,
-                "supports_function_calling": True,
-                "context_window": 8192,
-                "cost_per_1k_tokens": 0.0
-            },
-            {
-                "id": "llama-3.1-8b-instant",
-                "name": "Llama 3.1 8B Instant",
-                "provider": "Groq",
-                "type": "general",
-                "supports_streaming": True,
-                "supports_function_calling": True,
-                "context_window": 8192,
-                "cost_per_1k_tokens": 0.0
-            },
-            # Coding Models
-            {
-                "id": "qwen/qwen3-coder:free",
-                "name": "Qwen3 Coder",
-                "provider": "OpenRouter",
-                "type": "coding",
-                "supports_streaming": True,
-                "supports_function_calling": True,
-                "context_window": 32768,
-                "cost_per_1k_tokens": 0.0
-            },
-            {
-                "id": "x-ai/grok-2:free",
-                "name": "Grok 2",
-                "provider": "OpenRouter",
-                "type": "coding",
-                "supports_streaming": True,
-                "supports_function_calling": True,
-                "context_window": 32768,
-                "cost_per_1k_tokens": 0.0
-            },
-            # Reasoning Models
-            {
-                "id": "moonshotai/kimi-k2:free",
-                "name": "Kimi K2",
-                "provider": "OpenRouter",
-                "type": "reasoning",
-                "supports_streaming": True,
-                "supports_function_calling": True,
-                "context_window": 128000,
-                "cost_per_1k_tokens": 0.0
-            },
-            {
-                "id": "deepseek/deepseek-r1:free",
-                "name": "DeepSeek R1",
-                "provider": "OpenRouter",
-                "type": "reasoning",
-                "supports_streaming": True,
-                "supports_function_calling": True,
-                "context_window": 64000,
-                "cost_per_1k_tokens": 0.0
-            },
-            # Vision/Image Models
-            {
-                "id": "google/gemma-3-27b-it:free",
-                "name": "Gemma 3 27B",
-                "provider": "OpenRouter",
-                "type": "image",
-                "supports_streaming": True,
-                "supports_function_calling": True,
-                "context_window": 8192,
-                "cost_per_1k_tokens": 0.0
-            },
-            {
-                "id": "qwen/qwen2.5-vl-32b-instruct:free",
-                "name": "Qwen2.5 VL 32B",
-                "provider": "OpenRouter",
-                "type": "image",
-                "supports_streaming": True,
-                "supports_function_calling": True,
-                "context_window": 32768,
-                "cost_per_1k_tokens": 0.0
-            },
-            {
-                "id": "nvidia/nemotron-nano-12b-v2-vl:free",
-                "name": "Nemotron Nano 12B V2 VL",
-                "provider": "OpenRouter",
-                "type": "image",
-                "supports_streaming": True,
-                "supports_function_calling": True,
-                "context_window": 8192,
-                "cost_per_1k_tokens": 0.0
-            },
-            # Text Processing Models
-            {
-                "id": "gemini-2.5-flash",
-                "name": "Gemini 2.5 Flash",
-                "provider": "Google",
-                "type": "text",
-                "supports_streaming": True,
-                "supports_function_calling": True,
-                "context_window": 1000000,
-                "cost_per_1k_tokens": 0.0
-            },
-        ]
-        
-        logger.info(f"Retrieved {len(models)} available models for user {user_id}")
-        return {
-            "success": True,
-            "models": models,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    except Exception as e:
-        logger.error(f"Error retrieving available models: {e}")
-        raise HTTPException(status_code=500, detail="Failed to retrieve available models")
+    if model_type and not provider:
+        models_json = _MODELS_JSON_BY_TYPE.get(model_type, b"[]")
+        logger.info("Retrieved %s models for user %s", model_type, user_id)
+        body = _MODELS_BODY_HEAD + models_json + _MODELS_BODY_MID + _MODELS_GENERATED_AT + _MODELS_BODY_SUFFIX
+        return Response(content=body, media_type="application/json")
+    
+    if model_type or provider:
+        models = _filter_models(model_type=model_type, provider=provider)
+        logger.info("Retrieved %d available models for user %s", len(models), user_id)
+        body = _MODELS_BODY_HEAD + orjson.dumps(models) + _MODELS_BODY_MID + _MODELS_GENERATED_AT + _MODELS_BODY_SUFFIX
+        return Response(content=body, media_type="application/json")
+    
+    # Large catalogs stream uncompressed, so only the identity representation applies
+    encoding = None if _STREAM_MODELS else _negotiate_encoding(request.headers.get("accept-encoding", ""))
+    headers = _MODELS_HEADERS_BY_ENCODING[encoding]
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    logger.info("Retrieved %d available models for user %s", _N_MODELS, user_id)
+    if _STREAM_MODELS:
+        return StreamingResponse(
+            _iter_models_body(),
+            media_type="application/json",
+            headers=headers
+        )
+    return Response(content=_MODELS_BODIES[encoding], media_type="application/json", headers=headers)
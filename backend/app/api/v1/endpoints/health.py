@@ -1,215 +1,384 @@
+import asyncio
+import hashlib
 import logging
 import time
-from datetime import datetime
-from typing import Dict, Any
-from fastapi import APIRouter
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+import orjson
+from fastapi import APIRouter, Request, status
+from fastapi.responses import ORJSONResponse, Response
 from app.services.ai_provider import provider_manager
 from app.core.config import settings
+from app.db.redis import get_redis
+
+try:
+    from prometheus_client import Gauge
+except ImportError:
+    Gauge = None
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/health", tags=["health"])
+router = APIRouter(prefix="/health", tags=["health"], default_response_class=ORJSONResponse)
 
 
-@router.get("/")
-def health_check() -> Dict[str, Any]:
-    """Basic health check endpoint."""
+# Health timestamps have one-second granularity; a ticker refreshes the cached
+# ISO string and the prebuilt basic health body once a second
+_HEALTH_BODY_TMPL = b'{"status":"healthy","timestamp":"%s","service":"ChatBot API","version":"1.0.0"}'
+
+
+def _now_iso_utc() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+# Probers, load balancers and CDNs may reuse a health response briefly and revalidate by ETag
+_HEALTH_CACHE_CONTROL = "public, max-age=5, stale-while-revalidate=30"
+
+
+def _cache_headers(body: bytes) -> Dict[str, str]:
     return {
-        "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat(),
-        "service": "ChatBot API",
-        "version": "1.0.0"
+        "ETag": '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"',
+        "Cache-Control": _HEALTH_CACHE_CONTROL
     }
 
 
-@router.get("/detailed")
-async def detailed_health_check() -> Dict[str, Any]:
-    """Detailed health check with component status."""
-    health_status = {
-        "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat(),
-        "service": "ChatBot API",
-        "version": "1.0.0",
-        "checks": {}
-    }
+def _build_health_response(now_iso: str) -> Tuple[bytes, Dict[str, str]]:
+    body = _HEALTH_BODY_TMPL % now_iso.encode()
+    return body, _cache_headers(body)
+
+
+# Body and headers are swapped as one tuple so a reader never pairs a body with
+# the ETag from a different tick
+_now_iso = _now_iso_utc()
+_health_response = _build_health_response(_now_iso)
+_health_tasks: List[asyncio.Task] = []
+
+
+async def _tick_health_body():
+    global _now_iso, _health_response
+    while True:
+        await asyncio.sleep(1)
+        _now_iso = _now_iso_utc()
+        _health_response = _build_health_response(_now_iso)
+
+
+# Collection counts are sampled in the background so probes never query MongoDB for them
+_STATS_INTERVAL = 30
+_STATS_COLLECTIONS = ("users", "sessions", "messages")
+_COUNT_GAUGES = {
+    name: Gauge(f"mongo_{name}_total", f"Estimated number of documents in the {name} collection")
+    for name in _STATS_COLLECTIONS
+} if Gauge is not None else {}
+_collection_stats: Optional[Dict[str, Any]] = None
+
+
+async def _sample_collection_counts():
+    global _collection_stats
+    from app.db.mongodb import mongodb_manager
+
+    # Unfiltered counts come from collection metadata instead of a scan
+    db_instance = mongodb_manager.get_database()
+    counts = await asyncio.wait_for(
+        asyncio.gather(*(db_instance[name].estimated_document_count() for name in _STATS_COLLECTIONS)),
+        timeout=_CHECK_TIMEOUT
+    )
+    stats = dict(zip(_STATS_COLLECTIONS, counts))
+    for name, gauge in _COUNT_GAUGES.items():
+        gauge.set(stats[name])
+    _collection_stats = {"sampled_at": _now_iso, "stats": stats}
 
-    # MongoDB check (Atlas for auth and chat storage)
+
+async def _poll_collection_counts():
+    while True:
+        try:
+            await _sample_collection_counts()
+        except Exception as e:
+            logger.warning(f"Collection count sampling failed: {e}")
+        await asyncio.sleep(_STATS_INTERVAL)
+
+
+def start_health_ticker():
+    """Start the health background tasks: timestamp ticker and collection count sampler."""
+    if not _health_tasks:
+        _health_tasks.append(asyncio.create_task(_tick_health_body()))
+        _health_tasks.append(asyncio.create_task(_poll_collection_counts()))
+
+
+async def stop_health_ticker():
+    """Stop the health background tasks (called on app shutdown)."""
+    for task in _health_tasks:
+        task.cancel()
+    await asyncio.gather(*_health_tasks, return_exceptions=True)
+    _health_tasks.clear()
+
+
+@router.get("/")
+async def health_check(request: Request) -> Response:
+    """Basic health check endpoint."""
+    body, headers = _health_response
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Budget (seconds) for each external call, so a stalled database cannot hang the probe
+_CHECK_TIMEOUT = 1.5
+
+# Severity order used to combine sub-check outcomes into the overall status
+_STATUS_RANK = {"healthy": 0, "degraded": 1, "unhealthy": 2}
+
+
+async def _check_mongo() -> Tuple[Dict[str, Any], str]:
+    """MongoDB check (Atlas for auth and chat storage)."""
     try:
         from app.db.mongodb import mongodb_manager
-        if settings.MONGO_URI:
-            start_time = time.time()
-            mongo_healthy = await mongodb_manager.health_check()
-            mongo_time = time.time() - start_time
-            
-            if mongo_healthy:
-                # Get collection stats
-                try:
-                    db_instance = mongodb_manager.get_database()
-                    users_count = await db_instance.users.count_documents({})
-                    sessions_count = await db_instance.sessions.count_documents({})
-                    messages_count = await db_instance.messages.count_documents({})
-                    
-                    health_status["checks"]["mongodb"] = {
-                        "status": "healthy",
-                        "type": "MongoDB Atlas",
-                        "purpose": "Auth & Chat Storage",
-                        "configured": True,
-                        "connected": True,
-                        "response_time": f"{mongo_time:.3f}s",
-                        "stats": {
-                            "users": users_count,
-                            "sessions": sessions_count,
-                            "messages": messages_count
-                        }
-                    }
-                except Exception:
-                    health_status["checks"]["mongodb"] = {
-                        "status": "healthy",
-                        "type": "MongoDB Atlas",
-                        "purpose": "Auth & Chat Storage",
-                        "configured": True,
-                        "connected": True,
-                        "response_time": f"{mongo_time:.3f}s"
-                    }
-            else:
-                health_status["checks"]["mongodb"] = {
-                    "status": "unhealthy",
-                    "type": "MongoDB Atlas",
-                    "purpose": "Auth & Chat Storage",
-                    "configured": True,
-                    "connected": False,
-                    "message": "Connection failed or circuit breaker is open"
-                }
-                health_status["status"] = "degraded"
-        else:
-            health_status["checks"]["mongodb"] = {
+        if not settings.MONGO_URI:
+            return {
                 "status": "not_configured",
                 "type": "MongoDB Atlas",
                 "purpose": "Auth & Chat Storage",
                 "configured": False,
                 "connected": False
-            }
-            health_status["status"] = "unhealthy"
+            }, "unhealthy"
+
+        start_time = time.perf_counter()
+        try:
+            mongo_healthy = await asyncio.wait_for(mongodb_manager.health_check(), timeout=_CHECK_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"MongoDB health check timed out after {_CHECK_TIMEOUT}s")
+            return {
+                "status": "timeout",
+                "type": "MongoDB Atlas",
+                "purpose": "Auth & Chat Storage",
+                "configured": True,
+                "connected": False,
+                "message": f"No response within {_CHECK_TIMEOUT}s"
+            }, "degraded"
+        mongo_time = time.perf_counter() - start_time
+
+        if not mongo_healthy:
+            return {
+                "status": "unhealthy",
+                "type": "MongoDB Atlas",
+                "purpose": "Auth & Chat Storage",
+                "configured": True,
+                "connected": False,
+                "message": "Connection failed or circuit breaker is open"
+            }, "degraded"
+
+        # Ping only - collection stats are served by /health/stats
+        return {
+            "status": "healthy",
+            "type": "MongoDB Atlas",
+            "purpose": "Auth & Chat Storage",
+            "configured": True,
+            "connected": True,
+            "response_time_ms": int(mongo_time * 1000)
+        }, "healthy"
     except Exception as e:
         logger.error(f"MongoDB health check failed: {e}")
-        health_status["checks"]["mongodb"] = {
+        return {
             "status": "unhealthy",
             "type": "MongoDB Atlas",
             "purpose": "Auth & Chat Storage",
             "configured": True,
             "connected": False,
             "error": str(e)
-        }
-        health_status["status"] = "unhealthy"
+        }, "unhealthy"
 
-    # AI Providers check
-    try:
-        provider_status = {}
-        total_providers = 0
 
-        for category, providers in provider_manager.providers.items():
-            provider_status[category] = {
-                "total": len(providers),
-                "configured": len([p for p in providers if not hasattr(p, 'generate') or 'mock' not in str(type(p)).lower()])
-            }
-            total_providers += len(providers)
+async def _check_providers() -> Tuple[Dict[str, Any], str]:
+    """AI providers check."""
+    try:
+        total_providers = provider_manager.total_providers
 
-        health_status["checks"]["ai_providers"] = {
+        return {
             "status": "healthy" if total_providers > 0 else "degraded",
-            "categories": provider_status,
+            "categories": provider_manager.category_summary,
             "total_providers": total_providers
-        }
-
-        if total_providers == 0:
-            health_status["status"] = "degraded"
+        }, "healthy" if total_providers > 0 else "degraded"
 
     except Exception as e:
         logger.error(f"AI providers health check failed: {e}")
-        health_status["checks"]["ai_providers"] = {
+        return {
             "status": "unhealthy",
             "error": str(e)
-        }
-        health_status["status"] = "unhealthy"
+        }, "unhealthy"
 
-    # Configuration check
-    try:
-        config_issues = []
-
-        # Check if essential environment variables are set
-        required_configs = [
-            'SECRET_KEY',
-            'MONGO_URI'
-        ]
-
-        for config in required_configs:
-            if not hasattr(settings, config) or not getattr(settings, config):
-                config_issues.append(f"Missing or empty: {config}")
-
-        # Check if at least one AI provider is configured
-        ai_configs = [
-            'AI_SERVICES__OPEN_ROUTER_API_KEY_XAI',
-            'AI_SERVICES__OPEN_ROUTER_API_KEY_DEEPSEEK',
-            'AI_SERVICES__OPEN_ROUTER_API_KEY_GPT_OSS',
-            'AI_SERVICES__GROQ_API_KEY',
-            'AI_SERVICES__GEMINI_API_KEY'
-        ]
-
-        ai_configured = any(
-            hasattr(settings, config) and getattr(settings, config)
-            for config in ai_configs
-        )
 
-        if not ai_configured:
-            config_issues.append("No AI providers configured")
+# Settings are fixed after startup, so the configuration check is evaluated once at import
+_REQUIRED_CONFIGS = ('SECRET_KEY', 'MONGO_URI')
+_AI_CONFIGS = (
+    'AI_SERVICES__OPEN_ROUTER_API_KEY_XAI',
+    'AI_SERVICES__OPEN_ROUTER_API_KEY_DEEPSEEK',
+    'AI_SERVICES__OPEN_ROUTER_API_KEY_GPT_OSS',
+    'AI_SERVICES__GROQ_API_KEY',
+    'AI_SERVICES__GEMINI_API_KEY'
+)
 
-        health_status["checks"]["configuration"] = {
-            "status": "healthy" if not config_issues else "degraded",
-            "issues": config_issues
-        }
+_REQUIRED_MISSING = [config for config in _REQUIRED_CONFIGS if not getattr(settings, config, None)]
+_AI_CONFIGURED = any(getattr(settings, config, None) for config in _AI_CONFIGS)
 
-        if config_issues:
-            health_status["status"] = "degraded"
 
-    except Exception as e:
-        logger.error(f"Configuration health check failed: {e}")
-        health_status["checks"]["configuration"] = {
-            "status": "unhealthy",
-            "error": str(e)
-        }
-        health_status["status"] = "degraded"
+def _compute_config_check() -> Tuple[Dict[str, Any], str]:
+    """Configuration check result derived from the import-time settings scan."""
+    config_issues = [f"Missing or empty: {config}" for config in _REQUIRED_MISSING]
+
+    # Check if at least one AI provider is configured
+    if not _AI_CONFIGURED:
+        config_issues.append("No AI providers configured")
+
+    return {
+        "status": "healthy" if not config_issues else "degraded",
+        "issues": config_issues
+    }, "healthy" if not config_issues else "degraded"
+
+
+_CONFIG_CHECK = _compute_config_check()
+
+
+async def _check_config() -> Tuple[Dict[str, Any], str]:
+    """Configuration check (precomputed)."""
+    return _CONFIG_CHECK
+
+
+async def _build_detailed_health() -> Dict[str, Any]:
+    """Run all sub-checks and combine them into the detailed health payload."""
+    health_status = {
+        "status": "healthy",
+        "timestamp": _now_iso,
+        "service": "ChatBot API",
+        "version": "1.0.0",
+        "checks": {}
+    }
+
+    # Sub-checks are independent, so latency is the slowest one rather than the sum
+    results = await asyncio.gather(
+        _check_mongo(), _check_providers(), _check_config(),
+        return_exceptions=True
+    )
+
+    for name, result in zip(("mongodb", "ai_providers", "configuration"), results):
+        if isinstance(result, BaseException):
+            logger.error(f"{name} health check failed: {result}")
+            result = ({"status": "unhealthy", "error": str(result)}, "unhealthy")
+        check, status = result
+        health_status["checks"][name] = check
+        if _STATUS_RANK[status] > _STATUS_RANK[health_status["status"]]:
+            health_status["status"] = status
 
     return health_status
 
 
-@router.get("/providers")
-def provider_health_check() -> Dict[str, Any]:
-    """Check status of AI providers."""
-    try:
-        provider_info = {}
+# Detailed health is cached in Redis so probe storms cost one check per window.
+# Freshness adapts to how long the check took; stale entries only cover a
+# database check that timed out or raised, never one that reported a failure.
+_DETAILED_CACHE_KEY = "health:detailed"
+_DETAILED_MIN_TTL = 5
+_DETAILED_MAX_TTL = 30
+_DETAILED_STALE_TTL = 60
 
-        for category, providers in provider_manager.providers.items():
-            category_info = []
-            for provider in providers:
-                provider_data = {
-                    "name": getattr(provider, 'name', 'unknown'),
-                    "model": getattr(provider, 'model', 'unknown'),
-                    "type": type(provider).__name__
-                }
-                category_info.append(provider_data)
 
-            provider_info[category] = category_info
+@router.get("/detailed")
+async def detailed_health_check() -> Response:
+    """Detailed health check with component status."""
+    redis = get_redis()
+    cached = None
 
-        return {
-            "status": "healthy",
-            "timestamp": datetime.utcnow().isoformat(),
-            "providers": provider_info,
-            "total_categories": len(provider_info),
-            "total_providers": sum(len(providers) for providers in provider_info.values())
-        }
+    if redis is not None:
+        try:
+            cached = await redis.hgetall(_DETAILED_CACHE_KEY)
+            if cached and float(cached[b"fresh_until"]) > time.time():
+                return Response(content=cached[b"body"], media_type="application/json", headers={"X-Cache": "hit"})
+        except Exception as e:
+            logger.warning(f"Health cache read failed: {e}")
+            cached = None
+
+    generated_at = time.time()
+    start_time = time.perf_counter()
+    health_status = await _build_detailed_health()
+    gen_time = time.perf_counter() - start_time
+
+    # An inconclusive database check falls back to the last result, flagged as stale
+    mongo_check = health_status["checks"]["mongodb"]
+    if cached and (mongo_check["status"] == "timeout" or "error" in mongo_check):
+        try:
+            stale_status = orjson.loads(cached[b"body"])
+            if _STATUS_RANK.get(stale_status.get("status"), 0) < _STATUS_RANK["degraded"]:
+                stale_status["status"] = "degraded"
+            stale_status["stale"] = True
+            return Response(
+                content=orjson.dumps(stale_status),
+                media_type="application/json",
+                headers={"X-Cache": "stale"}
+            )
+        except Exception as e:
+            logger.warning(f"Stale health entry unusable: {e}")
+
+    body = orjson.dumps(health_status)
+
+    if redis is not None:
+        ttl = min(_DETAILED_MAX_TTL, max(_DETAILED_MIN_TTL, gen_time + 1))
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.hset(_DETAILED_CACHE_KEY, mapping={
+                    "body": body,
+                    "generated_at": generated_at,
+                    "fresh_until": time.time() + ttl
+                })
+                pipe.expire(_DETAILED_CACHE_KEY, _DETAILED_STALE_TTL)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Health cache write failed: {e}")
+
+    return Response(content=body, media_type="application/json", headers={"X-Cache": "miss"})
+
+
+@router.get("/stats")
+async def stats_health_check() -> Response:
+    """Approximate MongoDB collection counts, served from the background sample."""
+    if _collection_stats is None:
+        return Response(
+            content=orjson.dumps({"status": "unavailable", "timestamp": _now_iso}),
+            media_type="application/json"
+        )
+    return Response(
+        content=orjson.dumps({"status": "healthy", "timestamp": _now_iso, **_collection_stats}),
+        media_type="application/json"
+    )
+
+
+# Serialized provider registry, rebuilt only when the manager refreshes its summary
+_providers_body_cache: Tuple[Optional[Dict[str, Any]], bytes] = (None, b"")
+
+
+def _providers_body_tail() -> bytes:
+    global _providers_body_cache
+    info = provider_manager.provider_info
+    if _providers_body_cache[0] is not info:
+        _providers_body_cache = (
+            info,
+            b',"providers":' + orjson.dumps(info)
+            + b',"total_categories":%d,"total_providers":%d}' % (len(info), provider_manager.total_providers)
+        )
+    return _providers_body_cache[1]
+
+
+@router.get("/providers")
+async def provider_health_check(request: Request) -> Response:
+    """Check status of AI providers."""
+    try:
+        body = b'{"status":"healthy","timestamp":"' + _now_iso.encode() + b'"' + _providers_body_tail()
+        headers = _cache_headers(body)
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
     except Exception as e:
         logger.error(f"Provider health check failed: {e}")
-        return {
-            "status": "unhealthy",
-            "timestamp": datetime.utcnow().isoformat(),
-            "error": str(e)
-        }
\ No newline at end of file
+        return Response(
+            content=orjson.dumps({
+                "status": "unhealthy",
+                "timestamp": _now_iso,
+                "error": str(e)
+            }),
+            media_type="application/json"
+        )
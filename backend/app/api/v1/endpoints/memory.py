@@ -2,8 +2,11 @@
 Memory Management API Endpoints
 """
 import logging
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Dict, Any, AsyncIterator, Optional, Annotated
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Path, status
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import TypeAdapter
 
 from app.models.mongo_models import (
     UserMemoryDocument,
@@ -17,12 +20,70 @@ from app.models.mongo_models import (
     MemoryExportRequest,
     MemoryImportRequest
 )
-from app.services.memory_service import MemoryService, get_memory_service
+from app.services.memory_service import (
+    MemoryService, get_memory_service, memory_cache_key, store_memory_cache
+)
 from app.core.deps import get_current_user
+from app.db.redis import get_redis
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/memory", tags=["memory"])
+router = APIRouter(prefix="/memory", tags=["memory"], default_response_class=ORJSONResponse)
+
+_STREAM_JSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# 24-hex ObjectId; malformed ids get a 422 before any Mongo call
+_MEMORY_ID_PATTERN = r"^[0-9a-fA-F]{24}$"
+MemoryId = Annotated[str, Path(pattern=_MEMORY_ID_PATTERN)]
+
+_MEM_LIST_ADAPTER = TypeAdapter(List[UserMemoryDocument])
+
+# Bulky arrays list views never render; keep them on the server
+_MEMORY_LIST_PROJECTION = {"embedding": 0, "relationships": 0, "verification_history": 0}
+
+_TOP_MEMORY_METRIC_NAMES = ("access_count", "importance", "relevance_score", "confidence")
+_TOP_MEMORY_METRICS = frozenset(_TOP_MEMORY_METRIC_NAMES)
+_INVALID_METRIC_DETAIL = f"Invalid metric. Must be one of: {', '.join(_TOP_MEMORY_METRIC_NAMES)}"
+
+_TOP_MEMORY_PROJECTION = {
+    "content": 1, "memory_type": 1, "importance": 1, "confidence": 1, "relevance_score": 1,
+    "access_count": 1, "contexts": 1, "created_at": 1, "last_accessed": 1
+}
+
+def _memory_json(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Expose a raw memory document the way UserMemoryDocument serializes it (`id`, not `_id`)."""
+    oid = doc.pop("_id", None)
+    doc["id"] = str(oid) if oid is not None else None
+    return doc
+
+
+async def _memory_cache_get(key: str) -> Optional[bytes]:
+    redis = get_redis()
+    if redis is None:
+        return None
+    try:
+        return await redis.get(key)
+    except Exception as e:
+        logger.warning("Memory cache read failed for %s: %s", key, e)
+        return None
+
+
+async def _cached_json_response(user_id: str, key: str, data: Any) -> Response:
+    body = orjson.dumps(data, default=str, option=_STREAM_JSON_OPTS)
+    await store_memory_cache(user_id, key, body)
+    return Response(content=body, media_type="application/json")
+
+
+async def _stream_json_array(items: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Encode documents one by one into a JSON array as they come off the cursor."""
+    yield b"["
+    first = True
+    async for item in items:
+        if not first:
+            yield b","
+        first = False
+        yield orjson.dumps(item, default=str, option=_STREAM_JSON_OPTS)
+    yield b"]"
 
 
 @router.post("/", response_model=UserMemoryDocument, status_code=status.HTTP_201_CREATED)
@@ -46,14 +107,14 @@ async def create_memory(
         memory = await memory_service.create_memory(current_user_id, request)
         return memory
     except Exception as e:
-        logger.error(f"Failed to create memory: {e}")
+        logger.error("Failed to create memory: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create memory: {str(e)}"
         )
 
 
-@router.get("/", response_model=List[UserMemoryDocument])
+@router.get("/", response_model=List[UserMemoryDocument], response_model_exclude_none=True)
 async def list_memories(
     include_expired: bool = False,
     memory_type: str = None,
@@ -104,12 +165,12 @@ async def get_pending_memories(
     memories = await memory_service.get_pending_memories(current_user_id, limit)
     
     # Explicitly serialize to ensure 'id' field is used instead of '_id'
-    return [memory.model_dump(mode='json', by_alias=False) for memory in memories]
+    return _MEM_LIST_ADAPTER.dump_python(memories, mode='json', by_alias=False)
 
 
 @router.get("/{memory_id}", response_model=UserMemoryDocument)
 async def get_memory(
-    memory_id: str,
+    memory_id: MemoryId,
     current_user_id: str = Depends(get_current_user),
     memory_service: MemoryService = Depends(get_memory_service)
 ):
@@ -127,7 +188,7 @@ async def get_memory(
 
 @router.put("/{memory_id}", response_model=Dict[str, Any])
 async def update_memory(
-    memory_id: str,
+    memory_id: MemoryId,
     request: MemoryUpdateRequest,
     current_user_id: str = Depends(get_current_user),
     memory_service: MemoryService = Depends(get_memory_service)
@@ -148,7 +209,7 @@ async def update_memory(
 
 @router.delete("/{memory_id}", response_model=Dict[str, Any])
 async def delete_memory(
-    memory_id: str,
+    memory_id: MemoryId,
     current_user_id: str = Depends(get_current_user),
     memory_service: MemoryService = Depends(get_memory_service)
 ):
@@ -164,7 +225,7 @@ async def delete_memory(
     return {"success": True, "message": "Memory deleted successfully"}
 
 
-@router.post("/search", response_model=List[UserMemoryDocument])
+@router.post("/search", response_model=List[UserMemoryDocument], response_model_exclude_none=True)
 async def search_memories(
     request: MemorySearchRequest,
     current_user_id: str = Depends(get_current_user),
@@ -228,7 +289,7 @@ async def extract_memories(
 
 @router.post("/{memory_id}/reinforce", response_model=Dict[str, Any])
 async def reinforce_memory(
-    memory_id: str,
+    memory_id: MemoryId,
     current_user_id: str = Depends(get_current_user),
     memory_service: MemoryService = Depends(get_memory_service)
 ):
@@ -249,7 +310,7 @@ async def reinforce_memory(
 
 @router.post("/{memory_id}/verify", response_model=Dict[str, Any])
 async def verify_memory(
-    memory_id: str,
+    memory_id: MemoryId,
     request: MemoryVerificationRequest,
     current_user_id: str = Depends(get_current_user),
     memory_service: MemoryService = Depends(get_memory_service)
@@ -297,7 +358,7 @@ async def verify_memory(
     }
 
 
-@router.get("/by-context/{context}", response_model=List[UserMemoryDocument])
+@router.get("/by-context/{context}", response_model=None)
 async def get_memories_by_context(
     context: str,
     limit: int = 20,
@@ -314,26 +375,39 @@ async def get_memories_by_context(
     - limit: Maximum memories to return (default: 20)
     """
     try:
+        cache_key = memory_cache_key(current_user_id, "by-context", context, limit)
+        cached = await _memory_cache_get(cache_key)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+        
         query = {
             "user_id": current_user_id,
             "contexts": context,
             "status": {"$ne": "rejected"}  # Exclude rejected
         }
         
-        cursor = memory_service.memories_collection.find(query).sort([
+        cursor = memory_service.memories_collection.find(query, _MEMORY_LIST_PROJECTION).sort([
             ("importance", -1),
             ("relevance_score", -1)
-        ]).limit(limit)
+        ]).limit(limit).batch_size(max(limit, 0))
         
-        memories = []
-        async for doc in cursor:
-            memories.append(UserMemoryDocument(**doc))
+        async def _docs():
+            async for doc in cursor:
+                yield _memory_json(doc)
         
-        logger.info(f"Found {len(memories)} memories for context '{context}'")
-        return memories
+        async def _stream_and_cache():
+            # Keep the encoded chunks so a fully sent page can be cached without re-encoding
+            chunks = []
+            async for chunk in _stream_json_array(_docs()):
+                chunks.append(chunk)
+                yield chunk
+            await store_memory_cache(current_user_id, cache_key, b"".join(chunks))
+        
+        logger.info("Streaming memories for context '%s'", context)
+        return StreamingResponse(_stream_and_cache(), media_type="application/json")
         
     except Exception as e:
-        logger.error(f"Failed to get memories by context: {e}")
+        logger.error("Failed to get memories by context: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to retrieve memories: {str(e)}"
@@ -372,13 +446,18 @@ async def get_memory_summary(
     - Breakdown by type (preference, fact, topic, etc.)
     - Average importance and confidence by type
     """
+    cache_key = memory_cache_key(current_user_id, "summary")
+    cached = await _memory_cache_get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
     summary = await memory_service.get_memory_summary(current_user_id)
-    return summary
+    return await _cached_json_response(current_user_id, cache_key, summary)
 
 
 @router.post("/{memory_id}/link", response_model=Dict[str, Any])
 async def link_memories(
-    memory_id: str,
+    memory_id: MemoryId,
     request: MemoryRelationshipRequest,
     current_user_id: str = Depends(get_current_user),
     memory_service: MemoryService = Depends(get_memory_service)
@@ -420,7 +499,7 @@ async def link_memories(
 
 @router.get("/{memory_id}/related", response_model=List[Dict[str, Any]])
 async def get_related_memories(
-    memory_id: str,
+    memory_id: MemoryId,
     relationship_types: str = None,  # Comma-separated types
     min_strength: float = 0.5,
     current_user_id: str = Depends(get_current_user),
@@ -448,21 +527,23 @@ async def get_related_memories(
     )
     
     # Convert UserMemoryDocument to dict for JSON serialization
-    result = []
-    for item in related:
-        result.append({
-            "memory": item["memory"].model_dump(by_alias=True),
+    dumped = _MEM_LIST_ADAPTER.dump_python(
+        [item["memory"] for item in related], mode='json', by_alias=True
+    )
+    return [
+        {
+            "memory": memory,
             "relationship_type": item["relationship_type"],
             "relationship_strength": item["relationship_strength"],
             "created_at": item.get("created_at")
-        })
-    
-    return result
+        }
+        for memory, item in zip(dumped, related)
+    ]
 
 
 @router.get("/{memory_id}/graph", response_model=Dict[str, Any])
 async def get_memory_graph(
-    memory_id: str,
+    memory_id: MemoryId,
     max_depth: int = 2,
     current_user_id: str = Depends(get_current_user),
     memory_service: MemoryService = Depends(get_memory_service)
@@ -617,11 +698,16 @@ async def get_analytics_dashboard(
     - 50-69: Needs attention
     - 0-49: Critical
     """
+    cache_key = memory_cache_key(current_user_id, "dashboard")
+    cached = await _memory_cache_get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
     dashboard = await memory_service.get_analytics_dashboard(current_user_id)
-    return dashboard
+    return await _cached_json_response(current_user_id, cache_key, dashboard)
 
 
-@router.get("/analytics/top", response_model=List[Dict[str, Any]])
+@router.get("/analytics/top", response_model=None)
 async def get_top_memories(
     metric: str = "access_count",
     limit: int = 10,
@@ -644,39 +730,34 @@ async def get_top_memories(
     if limit > 50:
         limit = 50
     
-    from app.models.mongo_models import UserMemoryDocument
-    from bson import ObjectId
-    
-    valid_metrics = ["access_count", "importance", "relevance_score", "confidence"]
-    if metric not in valid_metrics:
+    if metric not in _TOP_MEMORY_METRICS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid metric. Must be one of: {', '.join(valid_metrics)}"
+            detail=_INVALID_METRIC_DETAIL
         )
     
     cursor = memory_service.memories_collection.find({
         "user_id": current_user_id,
         "status": {"$ne": "rejected"}
-    }).sort(metric, -1).limit(limit)
-    
-    top_memories = []
-    async for doc in cursor:
-        memory = UserMemoryDocument(**doc)
-        top_memories.append({
-            "id": memory.id,
-            "content": memory.content,
-            "type": memory.memory_type,
-            "importance": memory.importance,
-            "confidence": memory.confidence,
-            "relevance_score": memory.relevance_score,
-            "access_count": memory.access_count,
-            "contexts": memory.contexts,
-            "created_at": memory.created_at,
-            "last_accessed": memory.last_accessed,
-            "metric_value": getattr(memory, metric, 0)
-        })
-    
-    return top_memories
+    }, _TOP_MEMORY_PROJECTION).sort(metric, -1).limit(limit).batch_size(max(limit, 0))
+    
+    async def _rows():
+        async for doc in cursor:
+            yield {
+                "id": str(doc["_id"]),
+                "content": doc.get("content"),
+                "type": doc.get("memory_type"),
+                "importance": doc.get("importance", 0.5),
+                "confidence": doc.get("confidence", 1.0),
+                "relevance_score": doc.get("relevance_score", 1.0),
+                "access_count": doc.get("access_count", 0),
+                "contexts": doc.get("contexts", []),
+                "created_at": doc.get("created_at"),
+                "last_accessed": doc.get("last_accessed"),
+                "metric_value": doc.get(metric, 0)
+            }
+    
+    return StreamingResponse(_stream_json_array(_rows()), media_type="application/json")
 
 
 @router.post("/export", response_model=Dict[str, Any])
@@ -708,7 +789,7 @@ async def export_memories(
         )
         return export_data
     except Exception as e:
-        logger.error(f"Export failed: {e}")
+        logger.error("Export failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Export failed: {str(e)}"
@@ -747,7 +828,7 @@ async def import_memories(
         )
         return result
     except Exception as e:
-        logger.error(f"Import failed: {e}")
+        logger.error("Import failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Import failed: {str(e)}"
@@ -814,4 +895,4 @@ async def bulk_delete_memories(
     return {
         "success": True,
         "deleted": deleted
-    }
\ No newline at end of file
+    }
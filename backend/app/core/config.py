@@ -41,6 +41,9 @@ try:
         
         # OpenWeatherMap API Key (legacy support)
         OPENWEATHERMAP_API_KEY: str = ""
+        
+        # Function calling
+        TOOL_TIMEOUT: float = 15.0  # Seconds allowed per tool execution
 
         # Rate Limiting
         RATE_LIMIT__GENERAL_REQUESTS_PER_MINUTE: int = 100
@@ -116,6 +119,9 @@ except Exception as e:
         
         # OpenWeatherMap API Key (legacy support)
         OPENWEATHERMAP_API_KEY: str = os.getenv("OPENWEATHERMAP_API_KEY", "")
+        
+        # Function calling
+        TOOL_TIMEOUT: float = float(os.getenv("TOOL_TIMEOUT", "15"))
 
         # Rate Limiting
         RATE_LIMIT__GENERAL_REQUESTS_PER_MINUTE: int = int(os.getenv("RATE_LIMIT__GENERAL_REQUESTS_PER_MINUTE", "100"))
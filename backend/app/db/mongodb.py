@@ -163,6 +163,11 @@ class MongoDBManager:
                 ("created_at", -1)
             ], name="session_created")
 
+            await messages_collection.create_index([
+                ("session_id", 1),
+                ("branch_id", 1)
+            ], name="session_branch")
+
             await messages_collection.create_index([
                 ("content", "text"),
                 ("user_id", 1)
@@ -234,12 +239,14 @@ class MongoDBManager:
                 ("user_id", 1)
             ], name="content_text_user")
             
-            # Phase 2: Context-based indexes for contextual memory retrieval
+            # Phase 2: Context-based index for contextual memory retrieval; carries the
+            # full sort key of GET /memory/by-context so it needs no in-memory sort
             await user_memories_collection.create_index([
                 ("user_id", 1),
                 ("contexts", 1),
-                ("importance", -1)
-            ], name="user_contexts_importance")
+                ("importance", -1),
+                ("relevance_score", -1)
+            ], name="user_contexts_importance_relevance")
             
             # Phase 2: Time-context index
             await user_memories_collection.create_index([
@@ -265,6 +272,14 @@ class MongoDBManager:
                 ("user_id", 1),
                 ("related_memories", 1)
             ], name="user_related_memories")
+            
+            # Phase 5: Top-memories sort keys (importance is covered by user_importance_relevance)
+            for metric in ("access_count", "relevance_score", "confidence"):
+                await user_memories_collection.create_index([
+                    ("user_id", 1),
+                    (metric, -1),
+                    ("status", 1)
+                ], name=f"user_{metric}_status")
 
             logger.info("Database indexes created successfully")
 
@@ -277,7 +292,7 @@ class MongoDBManager:
             return False
 
         try:
-            if self.client and self.database:
+            if self.client is not None and self.database is not None:
                 await self.client.admin.command('ping')
                 return True
             return False
@@ -0,0 +1,40 @@
+"""
+Redis connection management (optional - used for caching)
+"""
+import logging
+from typing import Optional
+
+from app.core.config import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+_redis_client = None
+
+
+def get_redis() -> Optional["aioredis.Redis"]:
+    """Return the shared Redis client, or None when Redis is not configured."""
+    global _redis_client
+    if _redis_client is None:
+        if not settings.REDIS_URL or aioredis is None:
+            return None
+        _redis_client = aioredis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5
+        )
+        logger.info("Redis cache client initialized")
+    return _redis_client
+
+
+async def close_redis():
+    """Close the Redis connection pool."""
+    global _redis_client
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        _redis_client = None
+        logger.info("Disconnected from Redis")
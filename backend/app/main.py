@@ -17,13 +17,20 @@ load_dotenv()
 
 from app.core.config import settings
 from app.db.mongodb import init_mongodb, close_mongodb
+from app.db.redis import close_redis
 from app.api.v1 import api_router
+from app.api.v1.endpoints.health import start_health_ticker, stop_health_ticker
 from app.utils.exceptions import ChatBotException
 from app.schemas.error import ErrorResponse, ValidationErrorResponse, ValidationErrorDetail
 from app.middleware.rate_limit import limiter, EndpointRateLimitMiddleware
 from app.middleware.analytics import AnalyticsMiddleware
 from slowapi.errors import RateLimitExceeded
 
+try:
+    from prometheus_client import make_asgi_app
+except ImportError:
+    make_asgi_app = None
+
 # Configure logging with simple format (request_id added in middleware)
 logging.basicConfig(
     level=logging.INFO,
@@ -85,6 +92,8 @@ async def lifespan(app: FastAPI):
             logger.warning(f"Failed to start background scheduler: {scheduler_error}")
             # Non-critical, continue without scheduler
         
+        start_health_ticker()
+        
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         raise
@@ -102,7 +111,9 @@ async def lifespan(app: FastAPI):
     except Exception:
         pass
     
+    await stop_health_ticker()
     await close_mongodb()
+    await close_redis()
     logger.info("Application shutdown complete.")
 
 
@@ -173,6 +184,10 @@ def create_app() -> FastAPI:
     # Include API routers
     app.include_router(api_router, prefix="/api")
 
+    # Prometheus metrics (collection count gauges from the health sampler)
+    if make_asgi_app is not None:
+        app.mount("/metrics", make_asgi_app())
+
     # Global exception handlers
     @app.exception_handler(ChatBotException)
     async def chatbot_exception_handler(request: Request, exc: ChatBotException):
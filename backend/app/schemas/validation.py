@@ -279,6 +279,7 @@ class ExportFormat(str, Enum):
     json = "json"
     txt = "txt"
     markdown = "markdown"
+    bson = "bson"
 
 
 class ExportRequest(BaseModel):
@@ -3,7 +3,7 @@ import asyncio
 import random
 import re
 import json
-from typing import Dict, List, Optional, Literal
+from typing import Dict, List, Optional, Literal, Tuple
 import httpx
 from app.core.config import settings
 
@@ -15,6 +15,8 @@ logger = logging.getLogger(__name__)
 class AIProvider:
     """Base class for AI providers."""
 
+    _is_mock = False
+
 
     def __init__(self, name: str, api_key: str, base_url: str, model: str = None):
         self.name = name
@@ -56,14 +58,16 @@ class OpenRouterProvider(AIProvider):
             }
 
 
-            # Build message content
-            messages = []
+            # Build message content - use the structured history when the caller provides it
+            messages = kwargs.get("messages")
             
             # Check if this is a vision model and we have image data
             image_data = kwargs.get("image_data")
             image_format = kwargs.get("image_format", "image/jpeg")
             
-            if image_data and "vl" in self.model.lower():  # Vision model
+            if messages:
+                messages = list(messages)
+            elif image_data and "vl" in self.model.lower():  # Vision model
                 # For vision models, create a message with both text and image
                 message_content = [
                     {"type": "text", "text": prompt},
@@ -74,10 +78,10 @@ class OpenRouterProvider(AIProvider):
                         }
                     }
                 ]
-                messages.append({"role": "user", "content": message_content})
+                messages = [{"role": "user", "content": message_content}]
             else:
                 # Standard text-only message
-                messages.append({"role": "user", "content": prompt})
+                messages = [{"role": "user", "content": prompt}]
 
 
             payload = {
@@ -202,7 +206,7 @@ class GroqProvider(AIProvider):
 
             payload = {
                 "model": self.model,
-                "messages": [{"role": "user", "content": prompt}],
+                "messages": kwargs.get("messages") or [{"role": "user", "content": prompt}],
                 "max_tokens": kwargs.get("max_tokens", 1000),
                 "temperature": kwargs.get("temperature", 0.7)
             }
@@ -268,6 +272,10 @@ class GeminiProvider(AIProvider):
 
     def __init__(self, api_key: str, model: str = "gemini-2.5-flash"):
         super().__init__("gemini", api_key, "https://generativelanguage.googleapis.com/v1", model)
+        # Callers pass the same module-level tools list every request, so its
+        # Gemini conversion is kept and reused while that list is unchanged
+        self._converted_tools_src: Optional[List[Dict]] = None
+        self._converted_tools: List[Dict] = []
 
 
     async def generate(self, prompt: str, **kwargs) -> Dict:
@@ -280,14 +288,19 @@ class GeminiProvider(AIProvider):
 
 
             # Build the content parts with required role field
-            parts = [{"text": prompt}]
+            messages = kwargs.get("messages")
+            if messages:
+                contents, system_text = self._convert_messages_to_gemini_format(messages)
+            else:
+                contents = [{
+                    "role": "user",  # REQUIRED: Gemini needs explicit role
+                    "parts": [{"text": prompt}]
+                }]
+                system_text = None
 
 
             payload = {
-                "contents": [{
-                    "role": "user",  # REQUIRED: Gemini needs explicit role
-                    "parts": parts
-                }],
+                "contents": contents,
                 "generationConfig": {
                     "temperature": kwargs.get("temperature", 0.7),
                     "maxOutputTokens": kwargs.get("max_tokens", 1000),
@@ -296,13 +309,16 @@ class GeminiProvider(AIProvider):
                 }
             }
 
+            if system_text:
+                payload["systemInstruction"] = {"parts": [{"text": system_text}]}
+
 
             # Add tools if provided (for function calling)
             # Note: Gemini uses a different format for tools, so we convert OpenAI format
             tools = kwargs.get("tools")
             if tools:
                 logger.info(f"Gemini: Converting {len(tools)} tools to Gemini format")
-                gemini_tools = self._convert_tools_to_gemini_format(tools)
+                gemini_tools = self._gemini_tools_for(tools)
                 if gemini_tools:
                     payload["tools"] = gemini_tools
                     logger.info(f"Gemini: Added {len(gemini_tools)} tool declarations to payload")
@@ -399,6 +415,54 @@ class GeminiProvider(AIProvider):
             logger.error(f"Gemini API error for model {self.model} after {duration:.2f}ms: {e}")
             raise
     
+    def _convert_messages_to_gemini_format(self, messages: List[Dict]) -> Tuple[List[Dict], Optional[str]]:
+        """Convert OpenAI-style chat messages to Gemini contents plus a system instruction."""
+        contents = []
+        system_parts = []
+
+        for msg in messages:
+            role = msg.get("role")
+            if role == "system":
+                system_parts.append(msg.get("content") or "")
+            elif role == "assistant":
+                parts = []
+                if msg.get("content"):
+                    parts.append({"text": msg["content"]})
+                for tool_call in msg.get("tool_calls") or []:
+                    function = tool_call.get("function", {})
+                    args = function.get("arguments", {})
+                    if isinstance(args, str):
+                        try:
+                            args = json.loads(args) if args else {}
+                        except json.JSONDecodeError:
+                            args = {}
+                    parts.append({"functionCall": {"name": function.get("name", ""), "args": args}})
+                if parts:
+                    contents.append({"role": "model", "parts": parts})
+            elif role == "tool":
+                contents.append({
+                    "role": "function",
+                    "parts": [{
+                        "functionResponse": {
+                            "name": msg.get("name", ""),
+                            "response": {"content": msg.get("content", "")}
+                        }
+                    }]
+                })
+            else:
+                contents.append({"role": "user", "parts": [{"text": msg.get("content") or ""}]})
+
+        return contents, "\n\n".join(system_parts) if system_parts else None
+
+
+    def _gemini_tools_for(self, tools: List[Dict]) -> List[Dict]:
+        """Return the Gemini declarations for tools, converting only when the list changes."""
+        if tools is not self._converted_tools_src:
+            self._converted_tools = self._convert_tools_to_gemini_format(tools)
+            self._converted_tools_src = tools
+        return self._converted_tools
+
+
     def _convert_tools_to_gemini_format(self, openai_tools: List[Dict]) -> List[Dict]:
         """Convert OpenAI tool format to Gemini function declarations format."""
         try:
@@ -436,6 +500,8 @@ class GeminiProvider(AIProvider):
 class MockProvider:
     """Mock AI provider for local development and testing."""
 
+    _is_mock = True
+
 
     async def generate(self, prompt: str, **kwargs) -> Dict:
         import time
@@ -599,6 +665,8 @@ class AIProviderManager:
             for category in self.providers:
                 self.providers[category].append(MockProvider())
 
+        self._refresh_summary()
+
 
         # Log initialization summary
         logger.info(f"✅ Initialized AI providers: {dict((k, len(v)) for k, v in self.providers.items())}")
@@ -614,6 +682,32 @@ class AIProviderManager:
                 logger.info(f"  - {category}: {provider.name} ({provider.model})")
 
 
+    def _refresh_summary(self):
+        """Precompute the registry summaries served by the health endpoints.
+
+        The registry is fixed after initialization; call this again if providers change.
+        """
+        self.total_providers = sum(len(providers) for providers in self.providers.values())
+        self.category_summary = {
+            category: {
+                "total": len(providers),
+                "configured": sum(1 for p in providers if not p._is_mock)
+            }
+            for category, providers in self.providers.items()
+        }
+        self.provider_info = {
+            category: [
+                {
+                    "name": getattr(provider, 'name', 'unknown'),
+                    "model": getattr(provider, 'model', 'unknown'),
+                    "type": type(provider).__name__
+                }
+                for provider in providers
+            ]
+            for category, providers in self.providers.items()
+        }
+
+
     def _detect_request_type(self, prompt: str) -> str:
         """Detect the type of request based on prompt content."""
         prompt_lower = prompt.lower()
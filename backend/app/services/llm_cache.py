@@ -0,0 +1,45 @@
+"""
+Redis-backed cache for deterministic LLM completions
+"""
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+import orjson
+
+from app.db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+async def cached_generate(
+    key_parts: Any,
+    coro_factory: Callable[[], Awaitable[Dict]],
+    ttl: int = 300
+) -> Dict:
+    """Return a cached completion for key_parts, generating and storing it on a miss.
+
+    Redis errors never fail the request - the call falls through uncached.
+    """
+    redis = get_redis()
+    if redis is None:
+        return await coro_factory()
+
+    key = "llm:" + hashlib.sha256(orjson.dumps(key_parts)).hexdigest()[:32]
+
+    try:
+        val = await redis.get(key)
+        if val is not None:
+            logger.debug(f"LLM cache hit: {key}")
+            return orjson.loads(val)
+    except Exception as e:
+        logger.warning(f"LLM cache read failed, continuing uncached: {e}")
+
+    resp = await coro_factory()
+
+    try:
+        await redis.set(key, orjson.dumps(resp), ex=ttl)
+    except Exception as e:
+        logger.warning(f"LLM cache write failed: {e}")
+
+    return resp
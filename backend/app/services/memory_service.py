@@ -2,12 +2,16 @@
 AI Memory Service - Long-term user memory management with semantic search
 """
 import logging
+import hashlib
 import json
 import re
 from datetime import datetime, timedelta
+from functools import wraps
 from typing import List, Dict, Any, Optional, Tuple
 import asyncio
+from contextvars import ContextVar
 import httpx
+import orjson
 
 from app.models.mongo_models import (
     UserMemoryDocument,
@@ -19,10 +23,73 @@ from app.models.mongo_models import (
 )
 from app.core.config import settings
 from app.services.embedding_service import get_embedding_service
+from app.db.redis import get_redis
 
 logger = logging.getLogger(__name__)
 
 
+# Seconds a rendered memory read stays in Redis; memory writes invalidate it sooner
+MEMORY_CACHE_TTL = 30
+
+# Set while a write method runs, so nested writes leave invalidation to the outermost call
+_memory_write_in_progress: ContextVar[bool] = ContextVar("memory_write_in_progress", default=False)
+
+
+def memory_cache_key(user_id: str, endpoint: str, *params: Any) -> str:
+    """Redis key for one cached memory read, prefixed per user for invalidation."""
+    digest = hashlib.blake2b(orjson.dumps(params), digest_size=16).hexdigest()
+    return f"mem:{user_id}:{endpoint}:{digest}"
+
+
+def _memory_cache_index(user_id: str) -> str:
+    """Redis set holding every cached read key of a user."""
+    return f"memkeys:{user_id}"
+
+
+async def store_memory_cache(user_id: str, key: str, body: bytes) -> None:
+    """Cache a rendered memory read and record its key in the user's index set."""
+    redis = get_redis()
+    if redis is None:
+        return
+    index = _memory_cache_index(user_id)
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.setex(key, MEMORY_CACHE_TTL, body)
+            pipe.sadd(index, key)
+            pipe.expire(index, MEMORY_CACHE_TTL)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning("Memory cache write failed for %s: %s", key, e)
+
+
+async def invalidate_memory_cache(user_id: str) -> None:
+    """Drop every cached memory read for a user after a memory write."""
+    redis = get_redis()
+    if redis is None:
+        return
+    index = _memory_cache_index(user_id)
+    try:
+        keys = await redis.smembers(index)
+        await redis.delete(*keys, index)
+    except Exception as e:
+        logger.warning("Failed to invalidate memory cache for user %s: %s", user_id, e)
+
+
+def invalidates_memory_cache(func):
+    """Clear the user's cached memory reads once the outermost write method finishes."""
+    @wraps(func)
+    async def wrapper(self, user_id: str, *args, **kwargs):
+        if _memory_write_in_progress.get():
+            return await func(self, user_id, *args, **kwargs)
+        token = _memory_write_in_progress.set(True)
+        try:
+            return await func(self, user_id, *args, **kwargs)
+        finally:
+            _memory_write_in_progress.reset(token)
+            await invalidate_memory_cache(user_id)
+    return wrapper
+
+
 class MemoryService:
     """Service for managing user long-term memories with AI-powered extraction."""
 
@@ -47,6 +114,7 @@ class MemoryService:
             self._messages_collection = get_messages_collection()
         return self._messages_collection
 
+    @invalidates_memory_cache
     async def create_memory(
         self, 
         user_id: str, 
@@ -136,6 +204,7 @@ class MemoryService:
             logger.error(f"Failed to get memory {memory_id} for user {user_id}: {e}")
             return None
 
+    @invalidates_memory_cache
     async def update_memory(
         self,
         user_id: str,
@@ -176,6 +245,7 @@ class MemoryService:
             logger.error(f"Failed to update memory {memory_id}: {e}")
             return False
 
+    @invalidates_memory_cache
     async def delete_memory(self, user_id: str, memory_id: str) -> bool:
         """Delete a memory."""
         try:
@@ -472,6 +542,7 @@ class MemoryService:
             # On error, fall back to allowing the memory (fail open)
             return False, None
 
+    @invalidates_memory_cache
     async def extract_memories_from_conversation(
         self,
         user_id: str,
@@ -698,6 +769,7 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
             logger.error(f"AI memory extraction failed: {e}")
             return []
 
+    @invalidates_memory_cache
     async def reinforce_memory(self, user_id: str, memory_id: str) -> bool:
         """
         Reinforce a memory (increases relevance when confirmed/used).
@@ -729,6 +801,7 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
             logger.error(f"Failed to reinforce memory {memory_id}: {e}")
             return False
 
+    @invalidates_memory_cache
     async def verify_memory(
         self,
         user_id: str,
@@ -879,6 +952,7 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
             logger.error(f"Failed to get pending memories for user {user_id}: {e}")
             return []
 
+    @invalidates_memory_cache
     async def decay_memories(self, user_id: str, decay_rate: float = 0.01) -> int:
         """
         Apply temporal decay to memories that haven't been accessed recently.
@@ -1087,6 +1161,7 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
             "percentage_used": round((count / soft_limit) * 100, 1)
         }
     
+    @invalidates_memory_cache
     async def cleanup_old_memories(
         self,
         user_id: str,
@@ -1145,6 +1220,7 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
             logger.error(f"Failed to cleanup memories for user {user_id}: {e}")
             return 0
     
+    @invalidates_memory_cache
     async def link_memories(
         self,
         user_id: str,
@@ -1349,63 +1425,63 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
         try:
             from bson import ObjectId
             
-            # Get root memory
-            root_mem = await self.memories_collection.find_one({
-                "_id": ObjectId(memory_id),
-                "user_id": user_id
-            })
-            
-            if not root_mem:
-                return {"nodes": [], "edges": []}
-            
-            # BFS traversal
+            # Level-by-level BFS: one $in query per depth instead of one find_one per node
             visited = set()
             nodes = []
             edges = []
-            queue = [(memory_id, 0)]  # (memory_id, depth)
-            
-            while queue:
-                current_id, depth = queue.pop(0)
-                
-                if current_id in visited or depth > max_depth:
-                    continue
-                
-                visited.add(current_id)
+            frontier = [memory_id]
+            
+            for depth in range(max_depth + 1):
+                level_ids = []
+                for current_id in frontier:
+                    if current_id not in visited and ObjectId.is_valid(current_id):
+                        visited.add(current_id)
+                        level_ids.append(current_id)
                 
-                # Get current memory
-                mem_doc = await self.memories_collection.find_one({
-                    "_id": ObjectId(current_id),
-                    "user_id": user_id
-                })
+                if not level_ids:
+                    break
                 
-                if not mem_doc:
-                    continue
+                cursor = self.memories_collection.find(
+                    {
+                        "_id": {"$in": [ObjectId(mid) for mid in level_ids]},
+                        "user_id": user_id
+                    },
+                    {"content": 1, "memory_type": 1, "importance": 1, "relationships": 1}
+                )
+                docs_by_id = {str(doc["_id"]): doc async for doc in cursor}
                 
-                # Add node
-                nodes.append({
-                    "id": str(mem_doc["_id"]),
-                    "content": mem_doc["content"],
-                    "type": mem_doc["memory_type"],
-                    "importance": mem_doc.get("importance", 0.5),
-                    "depth": depth
-                })
+                if depth == 0 and memory_id not in docs_by_id:
+                    return {"nodes": [], "edges": []}
                 
-                # Process relationships
-                relationships = mem_doc.get("relationships", [])
-                for rel in relationships:
-                    target_id = rel["memory_id"]
+                frontier = []
+                for current_id in level_ids:
+                    mem_doc = docs_by_id.get(current_id)
+                    if not mem_doc:
+                        continue
                     
-                    # Add edge
-                    edges.append({
-                        "source": current_id,
-                        "target": target_id,
-                        "type": rel["type"],
-                        "strength": rel.get("strength", 0.8)
+                    # Add node
+                    nodes.append({
+                        "id": current_id,
+                        "content": mem_doc["content"],
+                        "type": mem_doc["memory_type"],
+                        "importance": mem_doc.get("importance", 0.5),
+                        "depth": depth
                     })
                     
-                    # Add to queue if not visited
-                    if target_id not in visited:
-                        queue.append((target_id, depth + 1))
+                    # Process relationships
+                    for rel in mem_doc.get("relationships", []):
+                        target_id = rel["memory_id"]
+                        
+                        # Add edge
+                        edges.append({
+                            "source": current_id,
+                            "target": target_id,
+                            "type": rel["type"],
+                            "strength": rel.get("strength", 0.8)
+                        })
+                        
+                        if target_id not in visited:
+                            frontier.append(target_id)
             
             logger.info(
                 f"Memory graph for {memory_id}: {len(nodes)} nodes, {len(edges)} edges "
@@ -1501,6 +1577,7 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
             logger.error(f"Failed to find related memories: {e}")
             return []
     
+    @invalidates_memory_cache
     async def detect_conflicts(
         self,
         user_id: str,
@@ -1654,6 +1731,7 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
         
         return False
     
+    @invalidates_memory_cache
     async def consolidate_memories(
         self,
         user_id: str,
@@ -1770,6 +1848,7 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
             logger.error(f"Failed to consolidate memories: {e}")
             return None
     
+    @invalidates_memory_cache
     async def classify_expiration_type(
         self,
         user_id: str,
@@ -1933,10 +2012,57 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
         Returns overview metrics, trends, and insights.
         """
         try:
-            from collections import defaultdict
+            # Every breakdown in one server-side pass instead of nine round trips
+            facet_pipeline = [
+                {"$match": {"user_id": user_id}},
+                {
+                    "$facet": {
+                        "total": [{"$count": "n"}],
+                        "by_status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+                        "by_type": [
+                            {
+                                "$group": {
+                                    "_id": "$memory_type",
+                                    "count": {"$sum": 1},
+                                    "avg_importance": {"$avg": "$importance"},
+                                    "avg_access": {"$avg": "$access_count"}
+                                }
+                            }
+                        ],
+                        "by_context": [
+                            {"$unwind": "$contexts"},
+                            {"$group": {"_id": "$contexts", "count": {"$sum": 1}}},
+                            {"$sort": {"count": -1}},
+                            {"$limit": 10}
+                        ],
+                        "quality": [
+                            {
+                                "$group": {
+                                    "_id": None,
+                                    "avg_importance": {"$avg": "$importance"},
+                                    "avg_confidence": {"$avg": "$confidence"},
+                                    "avg_relevance": {"$avg": "$relevance_score"},
+                                    "total_access_count": {"$sum": "$access_count"},
+                                    "max_access": {"$max": "$access_count"}
+                                }
+                            }
+                        ],
+                        "relationships": [
+                            {"$match": {"relationships": {"$exists": True, "$ne": []}}},
+                            {"$count": "n"}
+                        ],
+                        "conflicts": [{"$match": {"conflict_detected": True}}, {"$count": "n"}],
+                        "consolidated": [{"$match": {"is_consolidated": True}}, {"$count": "n"}],
+                        "by_expiration": [{"$group": {"_id": "$expiration_type", "count": {"$sum": 1}}}]
+                    }
+                }
+            ]
+            facets = (await self.memories_collection.aggregate(facet_pipeline).to_list(length=1))[0]
             
-            # Basic counts
-            total_memories = await self.memories_collection.count_documents({"user_id": user_id})
+            def _facet_count(name: str) -> int:
+                return facets[name][0]["n"] if facets[name] else 0
+            
+            total_memories = _facet_count("total")
             
             if total_memories == 0:
                 return {
@@ -1944,65 +2070,19 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
                     "message": "No memories yet. Start chatting to build your memory system!"
                 }
             
-            # Status breakdown
-            status_pipeline = [
-                {"$match": {"user_id": user_id}},
-                {"$group": {"_id": "$status", "count": {"$sum": 1}}}
-            ]
-            status_cursor = self.memories_collection.aggregate(status_pipeline)
-            status_breakdown = {}
-            async for doc in status_cursor:
-                status_breakdown[doc["_id"]] = doc["count"]
+            status_breakdown = {doc["_id"]: doc["count"] for doc in facets["by_status"]}
             
-            # Type breakdown with averages
-            type_pipeline = [
-                {"$match": {"user_id": user_id}},
-                {
-                    "$group": {
-                        "_id": "$memory_type",
-                        "count": {"$sum": 1},
-                        "avg_importance": {"$avg": "$importance"},
-                        "avg_access": {"$avg": "$access_count"}
-                    }
-                }
-            ]
-            type_cursor = self.memories_collection.aggregate(type_pipeline)
-            type_breakdown = {}
-            async for doc in type_cursor:
-                type_breakdown[doc["_id"]] = {
+            type_breakdown = {
+                doc["_id"]: {
                     "count": doc["count"],
                     "avg_importance": round(doc["avg_importance"], 2),
                     "avg_access_count": round(doc["avg_access"], 1)
                 }
+                for doc in facets["by_type"]
+            }
             
-            # Context breakdown (top 10)
-            context_pipeline = [
-                {"$match": {"user_id": user_id}},
-                {"$unwind": "$contexts"},
-                {"$group": {"_id": "$contexts", "count": {"$sum": 1}}},
-                {"$sort": {"count": -1}},
-                {"$limit": 10}
-            ]
-            context_cursor = self.memories_collection.aggregate(context_pipeline)
-            context_breakdown = {}
-            async for doc in context_cursor:
-                context_breakdown[doc["_id"]] = doc["count"]
+            context_breakdown = {doc["_id"]: doc["count"] for doc in facets["by_context"]}
             
-            # Quality metrics
-            quality_pipeline = [
-                {"$match": {"user_id": user_id}},
-                {
-                    "$group": {
-                        "_id": None,
-                        "avg_importance": {"$avg": "$importance"},
-                        "avg_confidence": {"$avg": "$confidence"},
-                        "avg_relevance": {"$avg": "$relevance_score"},
-                        "total_access_count": {"$sum": "$access_count"},
-                        "max_access": {"$max": "$access_count"}
-                    }
-                }
-            ]
-            quality_cursor = self.memories_collection.aggregate(quality_pipeline)
             quality_metrics = {
                 "avg_importance": 0.0,
                 "avg_confidence": 0.0,
@@ -2010,7 +2090,7 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
                 "total_accesses": 0,
                 "max_accesses": 0
             }
-            async for doc in quality_cursor:
+            for doc in facets["quality"]:
                 quality_metrics = {
                     "avg_importance": round(doc.get("avg_importance", 0.0), 2),
                     "avg_confidence": round(doc.get("avg_confidence", 0.0), 2),
@@ -2019,30 +2099,11 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
                     "max_accesses": doc.get("max_access", 0)
                 }
             
-            # Advanced stats
-            relationship_count = await self.memories_collection.count_documents({
-                "user_id": user_id,
-                "relationships": {"$exists": True, "$ne": []}
-            })
+            relationship_count = _facet_count("relationships")
+            conflict_count = _facet_count("conflicts")
+            consolidated_count = _facet_count("consolidated")
             
-            conflict_count = await self.memories_collection.count_documents({
-                "user_id": user_id,
-                "conflict_detected": True
-            })
-            
-            consolidated_count = await self.memories_collection.count_documents({
-                "user_id": user_id,
-                "is_consolidated": True
-            })
-            
-            expiration_pipeline = [
-                {"$match": {"user_id": user_id}},
-                {"$group": {"_id": "$expiration_type", "count": {"$sum": 1}}}
-            ]
-            expiration_cursor = self.memories_collection.aggregate(expiration_pipeline)
-            expiration_breakdown = {}
-            async for doc in expiration_cursor:
-                expiration_breakdown[doc["_id"]] = doc["count"]
+            expiration_breakdown = {doc["_id"]: doc["count"] for doc in facets["by_expiration"]}
             
             # Calculate health score
             health_score = self._calculate_health_score(
@@ -2357,6 +2418,7 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
             logger.error(f"Failed to export memories: {e}")
             raise
     
+    @invalidates_memory_cache
     async def import_memories(
         self,
         user_id: str,
@@ -2481,6 +2543,7 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
             logger.error(f"Failed to import memories: {e}")
             raise
     
+    @invalidates_memory_cache
     async def set_privacy_settings(
         self,
         user_id: str,
@@ -2530,6 +2593,7 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
             logger.error(f"Failed to update privacy settings: {e}")
             return 0
     
+    @invalidates_memory_cache
     async def bulk_delete(
         self,
         user_id: str,
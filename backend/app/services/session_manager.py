@@ -1,11 +1,13 @@
 import logging
 import re
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from collections import defaultdict
 import asyncio
+import hashlib
 import time
 
+import orjson
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import (
     ConnectionFailure, 
@@ -16,6 +18,7 @@ from pymongo.errors import (
 )
 
 from app.db.mongodb import get_messages_collection, get_sessions_collection, get_analytics_collection, CircuitBreaker
+from app.db.redis import get_redis
 from app.models.mongo_models import (
     SessionDocument, MessageDocument, ConversationAnalytics, UserAnalytics,
     SessionCreateRequest, SessionUpdateRequest, MessageSearchRequest, SessionSearchRequest
@@ -32,6 +35,25 @@ from app.utils.exceptions import (
 
 logger = logging.getLogger(__name__)
 
+
+def sessions_cache_key(user_id: str, *params: Any) -> str:
+    """Redis key for one GET /sessions page, prefixed per user for invalidation."""
+    return f"sess:{user_id}:" + hashlib.blake2b(orjson.dumps(params), digest_size=16).hexdigest()
+
+
+async def invalidate_sessions_cache(user_id: str) -> None:
+    """Drop every cached GET /sessions page for a user after a session write."""
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        keys = [key async for key in redis.scan_iter(match=f"sess:{user_id}:*", count=100)]
+        if keys:
+            await redis.delete(*keys)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate sessions cache for user {user_id}: {e}")
+
+
 # Performance logging decorator
 def log_performance(operation_name: str):
     def decorator(func):
@@ -196,6 +218,82 @@ class SessionManager:
             logger.error(f"Unexpected error while getting session {session_id} for user {user_id}: {e}")
             raise DatabaseError(f"Failed to retrieve session: {str(e)}")
 
+    @log_performance("get_sessions_bulk")
+    async def get_sessions_bulk(self, user_id: str, session_ids: List[str]) -> List[SessionDocument]:
+        """Get several of a user's sessions in one query; missing ids are simply absent."""
+        try:
+            cursor = self.sessions_collection.find({
+                "user_id": user_id,
+                "session_id": {"$in": list(session_ids)}
+            })
+            try:
+                docs = await cursor.to_list(length=len(session_ids))
+            finally:
+                try:
+                    await cursor.close()
+                except Exception:
+                    pass
+
+            return [SessionDocument(**doc) for doc in docs]
+
+        except ConnectionFailure as e:
+            logger.error(f"Database connection failed while getting sessions for user {user_id}: {e}")
+            raise DatabaseConnectionError(f"Failed to connect to database: {str(e)}")
+        except (ServerSelectionTimeoutError, NetworkTimeout) as e:
+            logger.error(f"Database timeout while getting sessions for user {user_id}: {e}")
+            raise DatabaseTimeoutError(f"Database operation timed out: {str(e)}")
+        except Exception as e:
+            logger.error(f"Unexpected error while getting sessions for user {user_id}: {e}")
+            raise DatabaseError(f"Failed to retrieve sessions: {str(e)}")
+
+    @log_performance("get_session_with_recent")
+    async def get_session_with_recent(
+        self, user_id: str, session_id: str, limit: int = 10
+    ) -> Tuple[Optional[SessionDocument], List[MessageDocument]]:
+        """Get a session and its recent messages (chronological) in one round-trip."""
+        pipeline = [
+            {"$match": {"user_id": user_id, "session_id": session_id}},
+            {"$limit": 1},
+            {"$lookup": {
+                "from": self.messages_collection.name,
+                "localField": "session_id",
+                "foreignField": "session_id",
+                "pipeline": [
+                    {"$match": {"user_id": user_id}},
+                    {"$sort": {"created_at": -1}},
+                    {"$limit": limit}
+                ],
+                "as": "recent"
+            }}
+        ]
+
+        try:
+            cursor = self.sessions_collection.aggregate(pipeline)
+            try:
+                docs = await cursor.to_list(length=1)
+            finally:
+                try:
+                    await cursor.close()
+                except Exception:
+                    pass
+
+            if not docs:
+                return None, []
+
+            doc = docs[0]
+            recent = [MessageDocument(**m) for m in reversed(doc.pop("recent", []))]
+            return SessionDocument(**doc), recent
+
+        except ConnectionFailure as e:
+            logger.error(f"Database connection failed while getting session {session_id} for user {user_id}: {e}")
+            raise DatabaseConnectionError(f"Failed to connect to database: {str(e)}")
+        except (ServerSelectionTimeoutError, NetworkTimeout) as e:
+            logger.error(f"Database timeout while getting session {session_id} for user {user_id}: {e}")
+            raise DatabaseTimeoutError(f"Database operation timed out: {str(e)}")
+        except Exception as e:
+            logger.error(f"Unexpected error while getting session {session_id} for user {user_id}: {e}")
+            raise DatabaseError(f"Failed to retrieve session: {str(e)}")
+
     async def update_session(self, user_id: str, session_id: str, request: SessionUpdateRequest) -> bool:
         """Update session metadata."""
         # Validate session exists
@@ -343,6 +441,66 @@ class SessionManager:
             logger.info(f"Removed tag '{tag}' from session {session_id} for user {user_id}")
         return success
 
+    async def bulk_archive(self, user_id: str, session_ids: List[str]) -> int:
+        """Archive several sessions with one update_many; returns the number matched."""
+        result = await self.sessions_collection.update_many(
+            {"user_id": user_id, "session_id": {"$in": list(session_ids)}},
+            {"$set": {"status": "archived", "updated_at": datetime.utcnow()}}
+        )
+        logger.info(f"Archived {result.matched_count} sessions for user {user_id}")
+        return result.matched_count
+
+    async def bulk_tag(self, user_id: str, session_ids: List[str], tag: str) -> int:
+        """Add a tag to several sessions with one update_many; returns the number matched."""
+        if not tag:
+            return 0
+
+        result = await self.sessions_collection.update_many(
+            {"user_id": user_id, "session_id": {"$in": list(session_ids)}},
+            {"$addToSet": {"tags": tag}, "$set": {"updated_at": datetime.utcnow()}}
+        )
+        logger.info(f"Added tag '{tag}' to {result.matched_count} sessions for user {user_id}")
+        return result.matched_count
+
+    async def bulk_untag(self, user_id: str, session_ids: List[str], tag: str) -> int:
+        """Remove a tag from several sessions with one update_many; returns the number matched."""
+        if not tag:
+            return 0
+
+        result = await self.sessions_collection.update_many(
+            {"user_id": user_id, "session_id": {"$in": list(session_ids)}},
+            {"$pull": {"tags": tag}, "$set": {"updated_at": datetime.utcnow()}}
+        )
+        logger.info(f"Removed tag '{tag}' from {result.matched_count} sessions for user {user_id}")
+        return result.matched_count
+
+    async def bulk_delete(self, user_id: str, session_ids: List[str]) -> int:
+        """Delete several sessions and all their messages; returns the number of sessions deleted."""
+        session_filter = {"user_id": user_id, "session_id": {"$in": list(session_ids)}}
+        try:
+            # Delete all messages in the sessions first (safer order)
+            messages_result = await self.messages_collection.delete_many(session_filter)
+            session_result = await self.sessions_collection.delete_many(session_filter)
+
+            logger.info(
+                f"Deleted {session_result.deleted_count} sessions and "
+                f"{messages_result.deleted_count} messages for user {user_id}"
+            )
+            return session_result.deleted_count
+
+        except ConnectionFailure as e:
+            logger.error(f"Database connection failed during bulk session deletion for user {user_id}: {e}")
+            raise DatabaseConnectionError(f"Failed to connect to database: {str(e)}")
+        except (ServerSelectionTimeoutError, NetworkTimeout) as e:
+            logger.error(f"Database timeout during bulk session deletion for user {user_id}: {e}")
+            raise DatabaseTimeoutError(f"Database operation timed out: {str(e)}")
+        except OperationFailure as e:
+            logger.error(f"Database operation failed during bulk session deletion for user {user_id}: {e}")
+            raise DatabaseError(f"Database operation failed: {str(e)}")
+        except Exception as e:
+            logger.error(f"Unexpected error during bulk session deletion for user {user_id}: {e}")
+            raise DatabaseError(f"Failed to delete sessions: {str(e)}")
+
     @log_performance("add_message")
     async def add_message(self, message: MessageDocument) -> str:
         """Add a message to a session and update session statistics."""
@@ -409,6 +567,92 @@ class SessionManager:
             logger.error(f"Unexpected error while adding message to session {message.session_id}: {e}")
             raise DatabaseError(f"Failed to add message: {str(e)}")
 
+    @log_performance("add_messages")
+    async def add_messages(self, messages: List[MessageDocument]) -> List[str]:
+        """Add several messages to one session with a single insert and stats update."""
+        if not messages:
+            return []
+
+        user_id = messages[0].user_id
+        session_id = messages[0].session_id
+
+        # Validate message data
+        for message in messages:
+            if message.user_id != user_id or message.session_id != session_id:
+                raise MessageValidationError("All messages in a batch must belong to the same session")
+
+            if not message.content or not message.content.strip():
+                raise MessageValidationError("Message content cannot be empty")
+
+            if len(message.content) > 100000:  # 100KB limit
+                raise MessageValidationError("Message content exceeds maximum length (100KB)")
+
+            if message.role not in ["user", "assistant", "system"]:
+                raise MessageValidationError(f"Invalid message role: {message.role}")
+
+        # Validate that the session exists before adding messages
+        try:
+            session = await self.get_session(user_id, session_id)
+            if not session:
+                raise SessionNotFoundError(session_id)
+        except (DatabaseConnectionError, DatabaseTimeoutError, DatabaseError):
+            raise
+        except Exception as e:
+            logger.error(f"Error validating session {session_id} for user {user_id}: {e}")
+            raise DatabaseError(f"Failed to validate session: {str(e)}")
+
+        try:
+            # One round-trip for all documents; ids come back in input order
+            result = await self.messages_collection.insert_many(
+                [message.model_dump(by_alias=True, exclude_none=True) for message in messages],
+                ordered=False
+            )
+
+            if not result.acknowledged:
+                raise DatabaseError("Message insertion was not acknowledged")
+
+            message_ids = [str(inserted_id) for inserted_id in result.inserted_ids]
+
+            # Apply the batch to the session counters in one atomic update
+            # instead of re-aggregating the whole session per message
+            try:
+                await self.sessions_collection.update_one(
+                    {"user_id": user_id, "session_id": session_id},
+                    {
+                        "$inc": {
+                            "message_count": len(messages),
+                            "user_message_count": sum(1 for m in messages if m.role == "user"),
+                            "assistant_message_count": sum(1 for m in messages if m.role == "assistant"),
+                            "total_tokens": sum(m.token_count or 0 for m in messages)
+                        },
+                        "$max": {"last_activity": max(m.created_at for m in messages)},
+                        "$set": {"updated_at": datetime.utcnow()}
+                    }
+                )
+            except Exception as stats_error:
+                logger.warning(f"Failed to update session stats for {session_id}, but messages were stored: {stats_error}")
+
+            logger.info(f"Added {len(message_ids)} messages to session {session_id}")
+            return message_ids
+
+        except ConnectionFailure as e:
+            logger.error(f"Database connection failed while adding messages to session {session_id}: {e}")
+            raise DatabaseConnectionError(f"Failed to connect to database: {str(e)}")
+        except (ServerSelectionTimeoutError, NetworkTimeout) as e:
+            logger.error(f"Database timeout while adding messages to session {session_id}: {e}")
+            raise DatabaseTimeoutError(f"Database operation timed out: {str(e)}")
+        except DuplicateKeyError as e:
+            logger.error(f"Duplicate message ID in session {session_id}: {e}")
+            raise DatabaseDuplicateError(f"Message ID conflict: {str(e)}")
+        except OperationFailure as e:
+            logger.error(f"Database operation failed while adding messages to session {session_id}: {e}")
+            raise DatabaseError(f"Database operation failed: {str(e)}")
+        except DatabaseError:
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error while adding messages to session {session_id}: {e}")
+            raise DatabaseError(f"Failed to add messages: {str(e)}")
+
     async def update_message_tokens(self, message_id: str, token_count: Optional[int]) -> bool:
         """Update the token count for a specific message."""
         if token_count is None:
@@ -451,6 +695,21 @@ class SessionManager:
             except Exception:
                 pass  # Cursor might already be closed
 
+    async def iter_messages(self, user_id: str, session_id: str) -> AsyncIterator[MessageDocument]:
+        """Yield every message of a session in chronological order without buffering them."""
+        cursor = self.messages_collection.find(
+            {"user_id": user_id, "session_id": session_id}
+        ).sort("created_at", 1)
+
+        try:
+            async for doc in cursor:
+                yield MessageDocument(**doc)
+        finally:
+            try:
+                await cursor.close()
+            except Exception:
+                pass  # Cursor might already be closed
+
     async def get_recent_messages(self, user_id: str, session_id: str, limit: int = 10) -> List[MessageDocument]:
         """Get recent messages for context (most recent first)."""
         cursor = self.messages_collection.find(
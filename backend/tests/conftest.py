@@ -0,0 +1,14 @@
+"""
+Shared test setup: minimal settings so the app modules import without a .env
+"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key-that-is-long-enough-for-config")
+os.environ.setdefault("EMAIL__GMAIL_FROM_EMAIL", "test@example.com")
+os.environ.setdefault("EMAIL__GMAIL_APP_PASSWORD", "test-password")
+# A configured provider keeps the registry off the mock fallback at import
+os.environ.setdefault("AI_SERVICES__GROQ_API_KEY", "test-groq-key")
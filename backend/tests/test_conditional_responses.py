@@ -0,0 +1,140 @@
+"""
+Content negotiation, ETag/304 handling and path validation on the cached endpoints
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import chat, health, memory
+from app.core.deps import get_current_user
+from app.services.memory_service import get_memory_service
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0.5, br;q=0.4", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("br;q=0, gzip;q=0", None),
+    ("*;q=0", None),
+    ("gzip;q=bad", None),
+    ("brotli, gzips", None),
+])
+def test_negotiate_encoding(header, expected):
+    assert chat._negotiate_encoding(header) == expected
+
+
+@pytest.mark.skipif(chat.brotli is None, reason="brotli not installed")
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("*", "br"),
+    ("BR;q=0.9, gzip;q=0.8", "br"),
+])
+def test_negotiate_encoding_prefers_brotli(header, expected):
+    assert chat._negotiate_encoding(header) == expected
+
+
+def test_etag_matches():
+    assert chat._etag_matches('"a", "b"', '"b"')
+    assert chat._etag_matches("*", '"b"')
+    assert not chat._etag_matches(None, '"b"')
+    assert not chat._etag_matches('"a"', '"b"')
+
+
+@pytest.fixture
+def models_client():
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.dependency_overrides[get_current_user] = lambda: "user-1"
+    return TestClient(app)
+
+
+def test_models_revalidates_by_etag(models_client):
+    first = models_client.get("/chat/models", headers={"Accept-Encoding": "identity"})
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, max-age=300"
+    assert first.content == chat._MODELS_BODY
+
+    etag = first.headers["ETag"]
+    second = models_client.get(
+        "/chat/models", headers={"Accept-Encoding": "identity", "If-None-Match": etag}
+    )
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+
+
+def test_models_etag_differs_per_encoding(models_client):
+    identity = models_client.get("/chat/models", headers={"Accept-Encoding": "identity"})
+    gzipped = models_client.get("/chat/models", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.status_code == 200
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.headers["ETag"] != identity.headers["ETag"]
+
+    # An identity tag must not validate the gzip representation
+    stale = models_client.get(
+        "/chat/models", headers={"Accept-Encoding": "gzip", "If-None-Match": identity.headers["ETag"]}
+    )
+    assert stale.status_code == 200
+
+
+def test_models_variants_share_catalog_time(models_client):
+    full = models_client.get("/chat/models", headers={"Accept-Encoding": "identity"}).json()
+    filtered = models_client.get("/chat/models", params={"provider": "OpenRouter"}).json()
+    assert "timestamp" not in full
+    assert filtered["catalog_generated_at"] == full["catalog_generated_at"]
+
+
+@pytest.fixture
+def health_client():
+    app = FastAPI()
+    app.include_router(health.router)
+    return TestClient(app)
+
+
+def test_health_revalidates_by_etag(health_client):
+    first = health_client.get("/health/")
+    assert first.status_code == 200
+    body, headers = health._health_response
+    assert first.content == body
+    assert first.headers["ETag"] == headers["ETag"]
+
+    second = health_client.get("/health/", headers={"If-None-Match": headers["ETag"]})
+    assert second.status_code == 304
+
+    third = health_client.get("/health/", headers={"If-None-Match": '"not-the-tag"'})
+    assert third.status_code == 200
+
+
+class _UnreachableMemoryService:
+    async def get_memory(self, user_id, memory_id):
+        raise AssertionError("malformed ids must be rejected before the service is called")
+
+
+class _EmptyMemoryService:
+    async def get_memory(self, user_id, memory_id):
+        return None
+
+
+def _memory_client(service):
+    app = FastAPI()
+    app.include_router(memory.router)
+    app.dependency_overrides[get_current_user] = lambda: "user-1"
+    app.dependency_overrides[get_memory_service] = lambda: service
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("memory_id", [
+    "not-an-object-id",
+    "0123456789abcdef0123456",      # 23 characters
+    "0123456789abcdef012345678",    # 25 characters
+    "0123456789abcdef0123456g",     # non-hex character
+])
+def test_memory_id_rejects_malformed_ids(memory_id):
+    response = _memory_client(_UnreachableMemoryService()).get(f"/memory/{memory_id}")
+    assert response.status_code == 422
+
+
+def test_memory_id_accepts_hex_ids():
+    response = _memory_client(_EmptyMemoryService()).get("/memory/0123456789ABCDEF01234567")
+    assert response.status_code == 404
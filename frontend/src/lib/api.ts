@@ -155,7 +155,12 @@ export async function streamChatMessage(
             else if (parsed.type === 'tool_result' && onToolResult) {
               // Tool execution result
               onToolResult(parsed.name, parsed.result);
-            } 
+            }
+            else if (parsed.type === 'tool_call_complete') {
+              // Fast tool call: invocation and result delivered in one frame
+              onToolCall?.({ function: { name: parsed.name, arguments: parsed.args } });
+              onToolResult?.(parsed.name, parsed.result);
+            }
             else if (parsed.type === 'complete') {
               // Streaming complete
               completionData = parsed;